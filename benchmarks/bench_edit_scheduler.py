@@ -0,0 +1,99 @@
+"""Counts the message edits saved by EditScheduler on a simulated hunt session.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_edit_scheduler --sessions 200 --cycles 5
+"""
+import argparse
+import asyncio
+import time
+
+from game.render import EditScheduler
+
+
+class FakeEmbed:
+    def __init__(self):
+        self.title = ""
+        self.fields = ["", ""]
+
+    def to_dict(self):
+        return {"title": self.title, "fields": list(self.fields)}
+
+
+class FakeInteraction:
+    """Stand-in for discord.Interaction that counts edits and rate limits every Nth edit
+
+    A rate limited edit returns after "retry_after" seconds, as py-cord sleeps and retries
+    a 429 before returning.
+    """
+    def __init__(self, rate_limit_every = 0, retry_after = 0):
+        self.edits = 0
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+    async def edit(self, **kwargs):
+        self.edits += 1
+        if self.rate_limit_every and self.edits % self.rate_limit_every == 0:
+            await asyncio.sleep(self.retry_after)
+        await asyncio.sleep(0)
+
+
+async def hunt_session(scheduler, interaction, embed, cycles, scale):
+    """Replays the edit pattern of HuntingManager.hunting_loop (hunt timer, monster found, battle ticks)"""
+    for cycle in range(cycles):
+        for message in ("Hunting.", "Hunting..", "Hunting..."):
+            embed.fields[1] = message
+            scheduler.edit(interaction, embed = embed)
+            await asyncio.sleep(0.7 * scale)
+        embed.fields[1] = f"Monster {cycle}"
+        scheduler.edit(interaction, embed = embed)
+        for hit in range(4):
+            await asyncio.sleep(1 * scale)
+            embed.fields[0] = f"hit {cycle}/{hit}"
+            scheduler.edit(interaction, embed = embed)
+            #same payload edited twice in a row (stop_hunting did this)
+            scheduler.edit(interaction, embed = embed)
+    await scheduler.flush()
+
+
+async def run(sessions, cycles, interval, scale, rate_limit_every):
+    schedulers = []
+    interactions = []
+    jobs = []
+    for _ in range(sessions):
+        scheduler = EditScheduler(interval * scale, max_backoff = 30 * scale)
+        interaction = FakeInteraction(rate_limit_every, retry_after = 2 * interval * scale)
+        schedulers.append(scheduler)
+        interactions.append(interaction)
+        jobs.append(hunt_session(scheduler, interaction, FakeEmbed(), cycles, scale))
+
+    start = time.perf_counter()
+    await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+
+    requested = sum(scheduler.edits_requested for scheduler in schedulers)
+    sent = sum(scheduler.edits_sent for scheduler in schedulers)
+    skipped = sum(scheduler.edits_skipped for scheduler in schedulers)
+    limited = sum(scheduler.rate_limited for scheduler in schedulers)
+    print(f"sessions:           {sessions}")
+    print(f"edits requested:    {requested}")
+    print(f"edits sent:         {sent}")
+    print(f"unchanged skipped:  {skipped}")
+    print(f"rate limited edits: {limited}")
+    print(f"edits saved:        {requested - sent} ({(requested - sent) / requested:.1%})")
+    print(f"wall time:          {elapsed:.2f}s (clock compressed x{1 / scale:.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--sessions", type = int, default = 200)
+    parser.add_argument("--cycles", type = int, default = 5)
+    parser.add_argument("--interval", type = float, default = 1.0, help = "edit interval in game seconds")
+    parser.add_argument("--scale", type = float, default = 0.01, help = "real seconds per game second")
+    parser.add_argument("--rate-limit-every", type = int, default = 20, help = "rate limit every Nth edit (0 disables)")
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.cycles, args.interval, args.scale, args.rate_limit_every))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cost of logging battle events on the event loop and speed of the mmap reader.
+
+Records N events for a few thousand players while a loop lag probe runs, then
+rebuilds every player and the totals from the segments.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_eventlog --events 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.harness import loop_lag, percentile
+from game import eventlog
+from game.eventlog import EventLog, EventReader
+from game.models import Player
+
+
+async def write(log, players, events, rate):
+    """Record the events in bursts of "rate" events per tick of 10 ms"""
+    lag = []
+    monitor = asyncio.get_running_loop().create_task(loop_lag(lag))
+    kinds = (eventlog.HIT, eventlog.HURT, eventlog.KILL, eventlog.WORK)
+    spent = 0.0
+    for start in range(0, events, rate):
+        burst = time.perf_counter()
+        for index in range(start, min(events, start + rate)):
+            player = players[index % len(players)]
+            player.silver += 1
+            log.record(kinds[index % len(kinds)], player, 1, 5)
+        spent += time.perf_counter() - burst
+        await asyncio.sleep(0.01)
+    monitor.cancel()
+    return spent, lag
+
+
+async def run(args):
+    directory = args.directory or tempfile.mkdtemp()
+    players = [Player(discord_id, None) for discord_id in range(1, args.players + 1)]
+    log = EventLog(directory, segment_size = args.segment_mib * 2 ** 20)
+
+    spent, lag = await write(log, players, args.events, args.rate)
+    log.close()
+    print(f"records:          {log.records} ({log.segments} segments, {log.bytes_written / 2 ** 20:.1f} MiB)")
+    print(f"record cost:      {spent / max(1, log.records) * 1e9:.0f} ns per event on the loop")
+    print(f"event loop lag:   p50 {percentile(lag, 0.5) * 1e3:.3f} ms   p99 {percentile(lag, 0.99) * 1e3:.3f} ms")
+
+    reader = EventReader(directory)
+    start = time.perf_counter()
+    rebuilt = reader.players()
+    elapsed = time.perf_counter() - start
+    print(f"rebuild players:  {len(rebuilt)} in {elapsed:.2f}s ({log.records / elapsed:.0f} records/s)")
+    assert all(rebuilt[player.discord_id][2] == player.silver for player in players)
+
+    player_id = random.Random(0).choice(players).discord_id
+    start = time.perf_counter()
+    totals = reader.totals(player_id)
+    print(f"player totals:    {totals} in {time.perf_counter() - start:.2f}s")
+    if args.directory == None:
+        for path in eventlog.segment_paths(directory):
+            os.remove(path)
+        os.rmdir(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--events", type = int, default = 1000000)
+    parser.add_argument("--players", type = int, default = 5000)
+    parser.add_argument("--rate", type = int, default = 5000, help = "events recorded per 10 ms tick")
+    parser.add_argument("--segment-mib", type = int, default = 16)
+    parser.add_argument("--directory", help = "keep the log in this directory")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Memory and event throughput of py-cord's gateway state for each profile, offline.
+
+Synthetic guilds are created with their members and presences, then a stream of
+presence updates, member updates and messages is parsed. Like Discord, an event is
+only delivered when the profile's intents ask for it. Reports the Python memory
+held by the state (tracemalloc) and the time spent parsing the stream.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_gateway --guilds 5 --members 5000
+"""
+import argparse
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+
+from discord.ext import commands
+
+from game.profiles import PROFILES, bot_options
+
+JOINED = "2020-01-01T00:00:00+00:00"
+
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None}
+
+
+def member_payload(user_id):
+    return {"user": user_payload(user_id), "roles": [], "joined_at": JOINED, "deaf": False, "mute": False, "nick": f"nick{user_id}"}
+
+
+def presence_payload(guild_id, user_id, status):
+    return {"guild_id": str(guild_id), "user": {"id": str(user_id)}, "status": status, "activities": [], "client_status": {"desktop": status}}
+
+
+def guild_payload(guild_id, members):
+    user_ids = [guild_id * 10 ** 7 + index for index in range(members)]
+    return {
+        "id": str(guild_id), "name": f"guild{guild_id}", "owner_id": str(user_ids[0]),
+        "roles": [{
+            "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+            "colors": {"primary_color": 0, "secondary_color": None, "tertiary_color": None},
+            "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "emojis": [], "stickers": [], "features": [], "threads": [], "stage_instances": [], "voice_states": [],
+        "channels": [{"id": str(guild_id * 10), "type": 0, "name": "game", "position": 0, "permission_overwrites": []}],
+        "member_count": members, "large": members > 250, "unavailable": False,
+        "members": [member_payload(user_id) for user_id in user_ids],
+        "presences": [presence_payload(guild_id, user_id, "online") for user_id in user_ids],
+    }
+
+
+def event_stream(guilds, members, count, seed):
+    """(intent needed, event name, payload) as a large server sends them: mostly presences"""
+    rng = random.Random(seed)
+    events = []
+    for index in range(count):
+        guild_id = rng.randrange(guilds) + 1
+        user_id = guild_id * 10 ** 7 + rng.randrange(members)
+        kind = rng.random()
+        if kind < 0.7:
+            events.append(("presences", "PRESENCE_UPDATE", presence_payload(guild_id, user_id, rng.choice(("online", "idle", "dnd")))))
+        elif kind < 0.8:
+            events.append(("members", "GUILD_MEMBER_UPDATE", dict(member_payload(user_id), guild_id = str(guild_id))))
+        else:
+            events.append(("guild_messages", "MESSAGE_CREATE", {
+                "id": str(10 ** 15 + index), "channel_id": str(guild_id * 10), "guild_id": str(guild_id),
+                "author": user_payload(user_id), "member": member_payload(user_id),
+                "content": "!bot" if index % 10 == 0 else "hello", "timestamp": JOINED, "edited_timestamp": None,
+                "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+                "embeds": [], "pinned": False, "type": 0,
+            }))
+    return events
+
+
+def connect(profile, guilds, members, events):
+    """Gateway state of a fresh bot after the guilds were created and the stream parsed
+
+    Returns:
+
+    (state, events delivered, seconds spent parsing the stream)
+    """
+    options = bot_options(profile)
+    state = commands.Bot(**options)._connection
+    #events are only parsed, no listener runs
+    state.dispatch = lambda *args, **kwargs: None
+    intents = options["intents"]
+
+    for guild_id in range(1, guilds + 1):
+        payload = guild_payload(guild_id, members)
+        if not intents.members:
+            #without the members intent Discord only sends the bot's own member
+            payload["members"] = payload["members"][:1]
+        if not intents.presences:
+            payload["presences"] = []
+        state.parse_guild_create(payload)
+
+    delivered = [(name, payload) for intent, name, payload in events if getattr(intents, intent)]
+    start = time.perf_counter()
+    for name, payload in delivered:
+        state.parsers[name](payload)
+    return state, len(delivered), time.perf_counter() - start
+
+
+def measure(profile, guilds, members, events):
+    #timed without tracemalloc, which slows every allocation down
+    _, delivered, elapsed = connect(profile, guilds, members, events)
+
+    gc.collect()
+    tracemalloc.start()
+    state = connect(profile, guilds, members, events)[0]
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    cached_members = sum(len(guild._members) for guild in state.guilds)
+    print(f"{profile:<5}  events delivered {delivered:>7}/{len(events)}   "
+          f"parse time {elapsed:6.2f}s ({delivered / max(elapsed, 1e-9):.0f}/s)   "
+          f"state memory {memory / 2 ** 20:7.1f} MiB   members cached {cached_members}   "
+          f"messages cached {len(state._messages or ())}")
+
+
+async def run(args):
+    events = event_stream(args.guilds, args.members, args.events, args.seed)
+    for profile in PROFILES:
+        measure(profile, args.guilds, args.members, events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--guilds", type = int, default = 5)
+    parser.add_argument("--members", type = int, default = 5000, help = "members per guild")
+    parser.add_argument("--events", type = int, default = 50000)
+    parser.add_argument("--seed", type = int, default = 0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
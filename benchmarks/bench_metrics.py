@@ -0,0 +1,83 @@
+"""Cost of the metrics instrumentation per call.
+
+With metrics disabled nothing is wrapped, so the disabled cost is the same function
+call; this compares it with the instrumented call for a plain function, a coroutine
+and one async generator step (a tick session step).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics
+"""
+import argparse
+import asyncio
+import time
+
+from game.metrics import Metrics
+
+
+class Target:
+    def handler(self, value):
+        return value + 1
+
+    async def coroutine(self, value):
+        return value + 1
+
+    async def session(self):
+        while True:
+            yield 1
+
+
+def time_calls(function, calls):
+    start = time.perf_counter()
+    for value in range(calls):
+        function(value)
+    return (time.perf_counter() - start) / calls
+
+
+async def time_awaits(function, calls):
+    start = time.perf_counter()
+    for value in range(calls):
+        await function(value)
+    return (time.perf_counter() - start) / calls
+
+
+async def time_steps(session, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        await session.__anext__()
+    return (time.perf_counter() - start) / calls
+
+
+async def run(calls):
+    plain = Target()
+    disabled = (
+        time_calls(plain.handler, calls),
+        await time_awaits(plain.coroutine, calls),
+        await time_steps(plain.session(), calls),
+    )
+
+    class Instrumented(Target):
+        pass
+    metrics = Metrics()
+    for attribute in ("handler", "coroutine", "session"):
+        metrics.instrument(Instrumented, attribute)
+    target = Instrumented()
+    enabled = (
+        time_calls(target.handler, calls),
+        await time_awaits(target.coroutine, calls),
+        await time_steps(target.session(), calls),
+    )
+
+    print(f"{'':<16}{'disabled':>12}{'enabled':>12}{'overhead':>12}")
+    for name, off, on in zip(("function", "coroutine", "session step"), disabled, enabled):
+        print(f"{name:<16}{off * 1e9:>10.0f}ns{on * 1e9:>10.0f}ns{(on - off) * 1e9:>10.0f}ns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--calls", type = int, default = 200000)
+    asyncio.run(run(parser.parse_args().calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Measures simulated battles per second with the SQLite player store enabled.
+
+Each battle gives a player the reward of a kill: the store only sees a player marked
+dirty, the battle itself is timed by benchmarks.bench_rules.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_player_store --players 5000 --battles 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from game import rules
+from game.store import PlayerStore
+
+
+def reward(player):
+    """Player changes of a monster kill"""
+    player.experience += rules.kill_experience(player.level)
+    player.silver += rules.kill_silver(player.level)
+    player.monsters_defeated += 1
+
+
+def run(players, battles, cache_size, flush_interval):
+    path = os.path.join(tempfile.mkdtemp(), 'players.db')
+    store = PlayerStore(path, cache_size = cache_size, flush_interval = flush_interval)
+    ids = [random.randrange(players) for _ in range(battles)]
+
+    start = time.perf_counter()
+    last_flush = start
+    for discord_id in ids:
+        player = store.load(discord_id, f"player{discord_id}")
+        reward(player)
+        store.mark_dirty(player)
+
+        #write-behind: one batched transaction per flush interval
+        now = time.perf_counter()
+        if now - last_flush >= flush_interval:
+            store.flush()
+            last_flush = now
+    store.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"players:         {players} (cache {cache_size})")
+    print(f"battles:         {battles}")
+    print(f"battles/s:       {battles / elapsed:,.0f}")
+    print(f"cache hit rate:  {store.hits / (store.hits + store.misses):.1%}")
+    print(f"flushes:         {store.flushes} ({store.rows_written} rows written)")
+    print(f"database:        {os.path.getsize(path) / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--players", type = int, default = 5000)
+    parser.add_argument("--battles", type = int, default = 200000)
+    parser.add_argument("--cache-size", type = int, default = 2000)
+    parser.add_argument("--flush-interval", type = float, default = 0.1, help = "seconds between flushes")
+    args = parser.parse_args()
+    run(args.players, args.battles, args.cache_size, args.flush_interval)
+
+
+if __name__ == "__main__":
+    main()
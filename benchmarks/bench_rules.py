@@ -0,0 +1,106 @@
+"""Regression check for the cost of the game rules on the battle hot path.
+
+Times one hit of the real HuntingManager.battle on the fake Discord objects of
+benchmarks.fakes (a game won by the player is replaced by a new one, as a player
+starting again would) and the batched simulator. Exits with status 1 when a limit is
+exceeded, so a rule change that slows the hot path fails the check.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rules --max-ns-per-battle 20000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeChannel, FakeGuild, FakeInteraction, FakeMessage, FakeUser
+from game import views
+from game.sessions import SessionRegistry
+from game.store import PlayerStore
+from game.ticks import TickEngine
+
+
+def new_game(channel, user_id):
+    """Game view of a new player and the interaction its hunt edits the message with"""
+    view = views.MyView(FakeMessage(FakeUser(user_id), channel, "!bot"))
+    return view, FakeInteraction(view.owner, FakeMessage(None, channel))
+
+
+async def battle_hits(channel, user_ids, number):
+    """Seconds taken by "number" battle hits, the monster found as hunting_loop does"""
+    view, interaction = new_game(channel, next(user_ids))
+    start = time.perf_counter()
+    for _ in range(number):
+        hunting = view.hunting_manager
+        if hunting.state.monster_found == None:
+            hunting.state.monster_found = hunting.find_monster(hunting.state.player.level)
+        if not await hunting.battle(interaction) and view.is_finished():
+            view.state.renderer.close()
+            view, interaction = new_game(channel, next(user_ids))
+    elapsed = time.perf_counter() - start
+    view.close()
+    return elapsed
+
+
+async def time_battle_async(number):
+    directory = tempfile.mkdtemp()
+    store = PlayerStore(os.path.join(directory, "players.db"))
+    views.configure(TickEngine(), store, SessionRegistry())
+    channel = FakeChannel(1, FakeGuild(1))
+    #every game is a new player, a player who won stays at the last level
+    user_ids = itertools.count()
+    try:
+        return min([await battle_hits(channel, user_ids, number) for _ in range(5)]) / number * 1e9
+    finally:
+        store.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def time_battle(number):
+    return asyncio.run(time_battle_async(number))
+
+
+def time_simulator(players, steps):
+    from game.simulator import simulate
+    start = time.perf_counter()
+    report = simulate(players, steps)
+    return report["actions"] / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--number", type = int, default = 50000, help = "battle hits per timing run")
+    parser.add_argument("--players", type = int, default = 20000)
+    parser.add_argument("--steps", type = int, default = 200)
+    parser.add_argument("--max-ns-per-battle", type = float, default = 0, help = "fail above this (0 disables)")
+    parser.add_argument("--min-simulated-per-second", type = float, default = 0, help = "fail below this (0 disables)")
+    args = parser.parse_args()
+
+    failed = False
+    ns = time_battle(args.number)
+    print(f"battle hit:          {ns:,.0f} ns")
+    if args.max_ns_per_battle and ns > args.max_ns_per_battle:
+        print(f"  slower than the {args.max_ns_per_battle:,.0f} ns limit")
+        failed = True
+
+    try:
+        rate = time_simulator(args.players, args.steps)
+    except ImportError as error:
+        print(f"simulator:           skipped ({error})")
+    else:
+        print(f"simulator:           {rate:,.0f} actions/s")
+        if args.min_simulated_per_second and rate < args.min_simulated_per_second:
+            print(f"  slower than the {args.min_simulated_per_second:,.0f} actions/s limit")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
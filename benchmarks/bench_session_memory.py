@@ -0,0 +1,68 @@
+"""Reports the bytes held per concurrent game session.
+
+Builds real game views (views.MyView, as start_game does for each "!bot") on the fake
+Discord objects of benchmarks.fakes and measures them with tracemalloc, before and
+after the hunt embed is displayed. Everything a game keeps is counted: the discord.ui
+View and its buttons, SessionState, the Player loaded from the store, the
+EditScheduler, the embed models and the managers. The fake "!bot" messages and their
+authors are built before the measure starts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_memory --sessions 20000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.fakes import FakeChannel, FakeGuild, FakeMessage, FakeUser
+from game import views
+from game.sessions import SessionRegistry
+from game.store import PlayerStore
+from game.ticks import TickEngine
+
+
+async def measure(sessions, render):
+    directory = tempfile.mkdtemp()
+    store = PlayerStore(os.path.join(directory, "players.db"))
+    views.configure(TickEngine(), store, SessionRegistry(max_sessions = sessions, max_per_guild = sessions))
+    channel = FakeChannel(1, FakeGuild(1))
+    messages = [FakeMessage(FakeUser(discord_id), channel, "!bot") for discord_id in range(sessions)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [views.MyView(msg) for msg in messages]
+    if render:
+        for game in games:
+            game.state.embed_hunt.render()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    for game in games:
+        game.state.renderer.close()
+    store.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return (after - before) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--sessions", type = int, default = 20000)
+    args = parser.parse_args()
+
+    idle = asyncio.run(measure(args.sessions, render = False))
+    shown = asyncio.run(measure(args.sessions, render = True))
+    print(f"sessions:                  {args.sessions}")
+    print(f"bytes/session (idle):       {idle:,.0f}")
+    print(f"bytes/session (hunt shown): {shown:,.0f}")
+    print(f"sessions per GiB (idle):    {2 ** 30 / idle:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
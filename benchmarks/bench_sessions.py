@@ -0,0 +1,135 @@
+"""Drives N simulated users through the work, hunt, die and win flows offline.
+
+Reports p50/p99 handler latency, edits per session and event loop lag. The game
+clock is compressed by --time-scale so a full flow runs in a fraction of a second.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sessions --users 500
+    python -m benchmarks.bench_sessions --record scenario.jsonl
+    python -m benchmarks.bench_sessions --replay scenario.jsonl
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.harness import Harness, loop_lag, percentile
+from game.profiler import SamplingProfiler
+from game.scenario import load_scenario, save_scenario
+
+FLOWS = ("work", "hunt", "die", "win")
+
+
+def flow_events(flow, user_id, guild_id, start):
+    """Events of one user going through a flow (times in game seconds)"""
+    events = []
+    def add(t, action, **extra):
+        events.append(dict({"t": round(start + t, 3), "user": user_id, "guild": guild_id, "action": action}, **extra))
+
+    if flow == "work":
+        add(0, "set", player = {"silver": 100, "health": 150})
+        add(0.1, "bot")
+        add(2, "work")
+    elif flow == "hunt":
+        add(0.1, "bot")
+        add(2, "hunt")
+        add(30, "hunt")
+        add(32, "cancel")
+    elif flow == "die":
+        add(0, "set", player = {"health": 3, "level": 1, "experience": 0})
+        add(0.1, "bot")
+        add(2, "hunt")
+    elif flow == "win":
+        add(0, "set", player = {"level": 3, "experience": 90, "health": 250})
+        add(0.1, "bot")
+        add(2, "hunt")
+    return events
+
+
+def party_events(leader_id, member_ids, guild_id, start):
+    """Events of a party hunt: the members join the leader's game, which hunts then stops"""
+    events = flow_events("hunt", leader_id, guild_id, start)
+    for member_id in member_ids:
+        events.append({"t": round(start + 1.5, 3), "user": member_id, "guild": guild_id, "action": "party", "leader": leader_id})
+    return events
+
+
+def generate(users, guilds, spread, seed, party_size = 1):
+    rng = random.Random(seed)
+    events = []
+    if party_size > 1:
+        for leader_id in range(1, users + 1, party_size):
+            members = range(leader_id + 1, min(users + 1, leader_id + party_size))
+            events.extend(party_events(leader_id, members, rng.randrange(guilds) + 1, rng.uniform(0, spread)))
+        events.sort(key = lambda event: event["t"])
+        return events
+    for user_id in range(1, users + 1):
+        flow = FLOWS[user_id % len(FLOWS)]
+        events.extend(flow_events(flow, user_id, rng.randrange(guilds) + 1, rng.uniform(0, spread)))
+    events.sort(key = lambda event: event["t"])
+    return events
+
+
+async def run(events, time_scale, latency, lazy_work = False, metrics = False, event_log_path = None, profile = None):
+    harness = Harness(time_scale = time_scale, latency = latency, lazy_work = lazy_work, metrics = metrics, event_log_path = event_log_path)
+    lag = []
+    monitor = asyncio.get_running_loop().create_task(loop_lag(lag))
+    capture = None
+    if profile != None:
+        profiler = SamplingProfiler(harness.tick_engine, directory = profile[1], max_seconds = profile[0])
+        capture = asyncio.get_running_loop().create_task(profiler.capture(profile[0]))
+    start = time.perf_counter()
+    await harness.replay(events)
+    elapsed = time.perf_counter() - start
+    monitor.cancel()
+
+    sessions = len(harness.games)
+    edits = sum(message.edits for message, _ in harness.games.values())
+    print(f"users:              {len({event['user'] for event in events})}")
+    print(f"sessions:           {sessions}")
+    print(f"handlers run:       {harness.handlers} in {elapsed:.2f}s (clock compressed x{1 / time_scale:.0f})")
+    for action, values in sorted(harness.latencies.items()):
+        print(f"  {action:<8} p50 {percentile(values, 0.5) * 1e3:7.3f} ms   p99 {percentile(values, 0.99) * 1e3:7.3f} ms")
+    print(f"edits per session:  {edits / max(1, sessions):.1f}")
+    print(f"event loop lag:     p50 {percentile(lag, 0.5) * 1e3:.3f} ms   p99 {percentile(lag, 0.99) * 1e3:.3f} ms   max {max(lag, default = 0) * 1e3:.3f} ms")
+    print(f"sessions:           {harness.session_registry.metrics()}")
+    if harness.metrics != None:
+        print(harness.metrics.summary())
+    if capture != None:
+        report, paths = await capture
+        print(report.summary())
+        print(f"profile written to {', '.join(paths)}")
+    harness.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--users", type = int, default = 500)
+    parser.add_argument("--guilds", type = int, default = 5)
+    parser.add_argument("--spread", type = float, default = 60, help = "game seconds over which users arrive")
+    parser.add_argument("--time-scale", type = float, default = 0.01, help = "real seconds per game second")
+    parser.add_argument("--latency", type = float, default = 0.0, help = "simulated Discord latency (real seconds)")
+    parser.add_argument("--lazy-work", action = "store_true", help = "fast-forward the work sessions instead of stepping them")
+    parser.add_argument("--party-size", type = int, default = 1, help = "hunt in parties of this many users")
+    parser.add_argument("--metrics", action = "store_true", help = "instrument the game and print the metrics summary")
+    parser.add_argument("--event-log", help = "record the battle events in this directory")
+    parser.add_argument("--profile", type = float, metavar = "SECONDS", help = "capture a profile of the first seconds of the replay")
+    parser.add_argument("--profile-path", default = "profiles", help = "directory of the profile files")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--record", help = "save the generated scenario to this file")
+    parser.add_argument("--replay", help = "replay a recorded scenario instead of generating one")
+    args = parser.parse_args()
+
+    if args.replay:
+        events = load_scenario(args.replay)
+    else:
+        events = generate(args.users, args.guilds, args.spread, args.seed, args.party_size)
+    if args.record:
+        save_scenario(args.record, events)
+    asyncio.run(run(events, args.time_scale, args.latency, args.lazy_work, args.metrics, args.event_log,
+                    (args.profile, args.profile_path) if args.profile != None else None))
+
+
+if __name__ == "__main__":
+    main()
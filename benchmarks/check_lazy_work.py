@@ -0,0 +1,79 @@
+"""Regression check: the lazy work ends where the work_counter loop ends.
+
+Runs the real Workstation.work_counter loop on the fake Discord objects of
+benchmarks.fakes (its delays are skipped) for a grid of starting health and silver,
+and compares the counters done and the final health and silver with
+rules.work_steps and rules.work_result, which the lazy work uses instead of the loop.
+Exits with status 1 on the first difference.
+
+Run from the repository root:
+
+    python -m benchmarks.check_lazy_work
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from benchmarks.fakes import FakeChannel, FakeGuild, FakeInteraction, FakeMessage, FakeUser
+from game import rules, views
+from game.sessions import SessionRegistry
+from game.store import PlayerStore
+from game.ticks import TickEngine
+
+
+async def work_loop(channel, user_id, health, silver):
+    """(counters done, health, silver) of the work_counter loop started at this health and silver"""
+    view = views.MyView(FakeMessage(FakeUser(user_id), channel, "!bot"))
+    player = view.state.player
+    player.health, player.silver = health, silver
+    interaction = FakeInteraction(view.owner, FakeMessage(None, channel))
+    async for _ in view.work_manager.work_counter(interaction):
+        pass
+    steps = view.state.work_amount_count // view.state.work_counter_price
+    view.close()
+    return steps, player.health, player.silver
+
+
+async def check(health_step, silvers):
+    directory = tempfile.mkdtemp()
+    store = PlayerStore(os.path.join(directory, "players.db"))
+    views.configure(TickEngine(), store, SessionRegistry())
+    channel = FakeChannel(1, FakeGuild(1))
+    settings = views.game_config.for_guild(None)
+    price = rules.work_price(settings.work_counter_timeout, settings.work_price_per_second)
+    max_health = rules.PLAYER_MAX_HEALTH
+    cases = failures = 0
+    try:
+        for health in range(1, max_health, health_step):
+            for silver in silvers:
+                cases += 1
+                looped = await work_loop(channel, cases, health, silver)
+                steps = rules.work_steps(health, max_health, silver, price)
+                computed = (steps,) + rules.work_result(health, max_health, silver, price, steps)
+                if looped != computed:
+                    failures += 1
+                    print(f"health {health} silver {silver}: loop {looped} != lazy {computed}")
+    finally:
+        store.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return cases, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--health-step", type = int, default = 7, help = "starting health every N points")
+    args = parser.parse_args()
+    price = rules.work_price(5)
+    silvers = (0, 1, price - 1, price, price + 1, 2 * price, 2 * price + 1, 10 * price, 10 ** 4)
+    cases, failures = asyncio.run(check(args.health_step, silvers))
+    print(f"cases:    {cases}")
+    print(f"failures: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
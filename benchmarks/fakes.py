@@ -0,0 +1,103 @@
+"""Local stand-ins for the Discord objects the game touches (no gateway, no HTTP)."""
+import asyncio
+import itertools
+import time
+
+_ids = itertools.count(1)
+
+
+class FakeUser:
+    def __init__(self, user_id, nick = None):
+        self.id = user_id
+        self.nick = nick if nick != None else f"player{user_id}"
+        self.display_name = self.nick
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return self.nick
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild = None):
+        self.id = channel_id
+        self.guild = guild
+        self.sent = []
+        if guild != None:
+            guild.channels[channel_id] = self
+
+    async def send(self, content = None, **kwargs):
+        self.sent.append(content)
+        return FakeMessage(None, self, content)
+
+
+class FakeMessage:
+    """Message with the reply/delete/edit calls of discord.Message, counting what was done"""
+    def __init__(self, author, channel, content = "", latency = 0.0):
+        self.id = next(_ids)
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild if channel != None else None
+        self.content = content
+        self.latency = latency
+        self.replies = []
+        self.edits = 0
+        self.deleted = False
+        self.replied_at = None
+
+    async def reply(self, content = None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.replied_at = time.perf_counter()
+        message = FakeMessage(None, self.channel, content, self.latency)
+        message.embed = kwargs.get("embed")
+        message.view = kwargs.get("view")
+        self.replies.append(message)
+        return message
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+        self.content = None
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self):
+        self._done = True
+
+    async def send_message(self, content = None, **kwargs):
+        self._done = True
+        self.content = content
+
+
+class FakeInteraction:
+    """Button interaction on a bot message: edit() edits that message"""
+    def __init__(self, user, message, latency = 0.0):
+        self.id = next(_ids)
+        self.user = user
+        self.message = message
+        self.latency = latency
+        self.response = FakeResponse()
+
+    async def edit(self, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.response._done = True
+        self.message.edits += 1
+        #an embed is serialized on every real edit
+        embed = kwargs.get("embed")
+        if embed != None:
+            embed.to_dict()
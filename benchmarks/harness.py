@@ -0,0 +1,148 @@
+"""Offline harness: plays the game views against fake Discord objects with a compressed clock.
+
+Events use the scenario format of game.scenario ({"t", "user", "guild", "action"}):
+
+- "bot": the user sends !bot
+- "work", "hunt", "cancel": the user clicks that button of their game
+- "set": change the user's saved player before the game ({"player": {"health": 3}})
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeChannel, FakeGuild, FakeInteraction, FakeMessage, FakeUser
+from game import views
+from game.eventlog import EventLog
+from game.leaderboard import Leaderboard
+from game.metrics import Metrics, instrument_game
+from game.sessions import SessionRegistry
+from game.store import PlayerStore
+from game.ticks import TickEngine
+
+# Index of each button in MyView.children
+BUTTONS = views.BUTTON_ACTIONS
+
+
+class Harness:
+    def __init__(self, time_scale = 0.01, edit_interval = 1.0, latency = 0.0, db_path = None, lazy_work = False, metrics = False, event_log_path = None):
+        self.time_scale = time_scale
+        self.latency = latency
+        if db_path == None:
+            db_path = os.path.join(tempfile.mkdtemp(), "players.db")
+
+        self.tick_engine = TickEngine(time_scale = time_scale)
+        self.player_store = PlayerStore(db_path)
+        self.leaderboard = Leaderboard(self.player_store.name)
+        self.session_registry = SessionRegistry(idle_timeout = 600, clock = self.game_clock)
+        #instrumentation wraps the game classes for the rest of the process
+        self.metrics = Metrics() if metrics else None
+        if self.metrics != None:
+            instrument_game(self.metrics, self.tick_engine, self.session_registry)
+        self.event_log = EventLog(event_log_path) if event_log_path != None else None
+        views.configure(self.tick_engine, self.player_store, self.session_registry, edit_interval, time_scale, lazy = lazy_work, ranking = self.leaderboard, events = self.event_log)
+
+        self._guilds = {}
+        self._users = {}
+        #game message of each user: (bot message, view)
+        self.games = {}
+        self.latencies = {}
+        self.handlers = 0
+        self._pending = []
+        self._start = time.monotonic()
+
+    def game_clock(self):
+        return (time.monotonic() - self._start) / self.time_scale
+
+    def user(self, user_id):
+        if user_id not in self._users:
+            self._users[user_id] = FakeUser(user_id)
+        return self._users[user_id]
+
+    def channel(self, guild_id):
+        if guild_id not in self._guilds:
+            guild = FakeGuild(guild_id)
+            self._guilds[guild_id] = FakeChannel(guild_id, guild)
+        return self._guilds[guild_id]
+
+    async def replay(self, events):
+        """Play the events at their time (compressed by time_scale) and wait for the games to end
+        """
+        #each user plays their own events in order, users run side by side
+        by_user = {}
+        for event in events:
+            by_user.setdefault(event["user"], []).append(event)
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(self.play_user(start, user_events) for user_events in by_user.values()))
+        await asyncio.gather(*self._pending)
+        self._pending.clear()
+        await self.wait_idle()
+
+    async def play_user(self, start, events):
+        loop = asyncio.get_running_loop()
+        for event in events:
+            delay = start + event["t"] * self.time_scale - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.play(event)
+
+    async def wait_idle(self, timeout = 600):
+        """Wait until no hunt or work session is left in the tick engine
+        """
+        deadline = time.monotonic() + timeout * self.time_scale
+        while len(self.tick_engine) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def play(self, event):
+        action = event["action"]
+        user = self.user(event["user"])
+        if action == "set":
+            player = self.player_store.load(user.id, user.nick)
+            for name, value in event["player"].items():
+                setattr(player, name, value)
+            return
+
+        started = time.perf_counter()
+        if action == "bot":
+            msg = FakeMessage(user, self.channel(event.get("guild")), "!bot", self.latency)
+            game = asyncio.get_running_loop().create_task(views.start_game(msg))
+            while msg.replied_at == None and not game.done():
+                await asyncio.sleep(0)
+            self.measure(action, (msg.replied_at or time.perf_counter()) - started)
+            if msg.replies:
+                self.games[user.id] = (msg.replies[0], self.session_registry.get(user.id))
+            #the game task only waits to delete the !bot message now
+            self._pending.append(game)
+            return
+
+        #the party button is pressed on the leader's game
+        message, view = self.games.get(event.get("leader", user.id), (None, None))
+        if view == None:
+            return
+        await view.children[BUTTONS[action]].callback(FakeInteraction(user, message, self.latency))
+        self.measure(action, time.perf_counter() - started)
+
+    def measure(self, action, seconds):
+        self.handlers += 1
+        self.latencies.setdefault(action, []).append(seconds)
+
+    def close(self):
+        self.player_store.close()
+        if self.event_log != None:
+            self.event_log.close()
+
+
+async def loop_lag(samples, interval = 0.005):
+    """Measure how late the event loop wakes up from a sleep (runs until cancelled)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
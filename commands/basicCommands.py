@@ -8,13 +8,16 @@ class basicCommands(commands.Cog):
 
         self.bot = bot
 
-    
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.message):
-        if msg.content == "!bot":
-          channel = msg.guild.get_channel(msg.channel.id)
-          await channel.send(msg.author)
+        #"!bot" goes through the bot's message router instead of a second on_message listener
+        self.bot.router.add_route("!bot", self.send_author, exact=True)
+
+    def cog_unload(self):
+        self.bot.router.remove_route("!bot", self.send_author)
+
+    async def send_author(self, msg: discord.message):
+        channel = msg.guild.get_channel(msg.channel.id)
+        await channel.send(msg.author)
     
 
 def setup(bot:commands.Bot):
-    bot.add_cog(basicCommands(bot))
\ No newline at end of file
+    bot.add_cog(basicCommands(bot))
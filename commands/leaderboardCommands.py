@@ -0,0 +1,87 @@
+import time
+
+import discord
+from discord.ext import commands
+
+from game.leaderboard import BOARDS, BOARD_TITLES
+
+
+class leaderboardCommands(commands.Cog):
+    """"!top [level|silver|kills] [global]" and "!rank [level|silver|kills] [global]"
+
+    Replies are built from the bot's leaderboard and kept for "cache_ttl" seconds, so
+    the same query sent again during an event costs a dict lookup.
+    """
+
+    def __init__(self, bot:commands.Bot, cache_ttl = 10, cache_size = 1024):
+
+        self.bot = bot
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        #(command, board, guild_id, user_id) -> (expires, embed)
+        self._cache = {}
+
+        self.bot.router.add_route("!top", self.send_top)
+        self.bot.router.add_route("!rank", self.send_rank)
+
+    def cog_unload(self):
+        self.bot.router.remove_route("!top", self.send_top)
+        self.bot.router.remove_route("!rank", self.send_rank)
+
+    async def send_top(self, msg: discord.message):
+        board, guild_id = self.parse(msg)
+        embed = self.cached(("top", board, guild_id, None), lambda: self.top_embed(board, guild_id))
+        await msg.reply(embed = embed)
+
+    async def send_rank(self, msg: discord.message):
+        board, guild_id = self.parse(msg)
+        embed = self.cached(("rank", board, guild_id, msg.author.id), lambda: self.rank_embed(board, guild_id, msg.author))
+        await msg.reply(embed = embed)
+
+    def parse(self, msg):
+        """Board and scope of the command ("level" and the message's guild by default)
+        """
+        words = msg.content.split()[1:]
+        board = next((word for word in words if word in BOARDS), "level")
+        guild_id = None if "global" in words or msg.guild == None else msg.guild.id
+        return board, guild_id
+
+    def cached(self, key, build):
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry != None and entry[0] > now:
+            return entry[1]
+
+        if len(self._cache) >= self.cache_size:
+            self._cache = {key: entry for key, entry in self._cache.items() if entry[0] > now}
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+        embed = build()
+        self._cache[key] = (now + self.cache_ttl, embed)
+        return embed
+
+    def top_embed(self, board, guild_id):
+        scope = "Global" if guild_id == None else "Server"
+        embed = discord.Embed(title = f"{scope} Top - {BOARD_TITLES[board]}")
+        lines = [f"{rank}. {name} - {self.format_values(board, values)}" for rank, _, name, values in self.bot.leaderboard.top(board, 10, guild_id)]
+        embed.description = "\n".join(lines) if lines else "No players ranked yet"
+        return embed
+
+    def rank_embed(self, board, guild_id, author):
+        scope = "Global" if guild_id == None else "Server"
+        embed = discord.Embed(title = f"{scope} Rank - {BOARD_TITLES[board]}")
+        rank = self.bot.leaderboard.rank(board, author.id, guild_id)
+        if rank == None:
+            embed.description = f"{author.mention} is not ranked yet"
+        else:
+            embed.description = f"{author.mention} is #{rank[0]} of {rank[1]} - {self.format_values(board, rank[2])}"
+        return embed
+
+    def format_values(self, board, values):
+        if board == "level":
+            return f"Level {values[0]} ({values[1]} xp)"
+        return f"{values[0]}"
+
+
+def setup(bot:commands.Bot):
+    bot.add_cog(leaderboardCommands(bot))
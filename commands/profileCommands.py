@@ -0,0 +1,44 @@
+import discord
+from discord.ext import commands
+
+
+class profileCommands(commands.Cog):
+
+    def __init__(self, bot:commands.Bot):
+
+        self.bot = bot
+
+        self.bot.router.add_route("!profile", self.capture_profile)
+
+    def cog_unload(self):
+        self.bot.router.remove_route("!profile", self.capture_profile)
+
+    #only the server administrators can profile the bot
+    def is_admin(self, msg):
+        permissions = getattr(msg.author, 'guild_permissions', None)
+        return permissions != None and permissions.administrator
+
+    #"!profile [seconds]": samples the event loop and the game sessions, then writes the profile files
+    async def capture_profile(self, msg: discord.message):
+        if not self.is_admin(msg):
+            return
+        profiler = self.bot.profiler
+        if profiler.active:
+            await msg.reply("A profile is already being captured")
+            return
+        words = msg.content.split()
+        try:
+            seconds = float(words[1]) if len(words) > 1 else 10.0
+        except ValueError:
+            await msg.reply("Usage: !profile [seconds]")
+            return
+        seconds = max(0.1, min(seconds, profiler.max_seconds))
+
+        await msg.reply(f"Profiling for {seconds:g}s...")
+        capture, paths = await profiler.capture(seconds)
+        files = "\n".join(paths)
+        await msg.reply(f"```\n{capture.summary(top = 5)[:1600]}\n```Written to:\n{files}")
+
+
+def setup(bot:commands.Bot):
+    bot.add_cog(profileCommands(bot))
@@ -0,0 +1,32 @@
+import discord
+from discord.ext import commands
+
+
+class statsCommands(commands.Cog):
+
+    def __init__(self, bot:commands.Bot):
+
+        self.bot = bot
+
+        self.bot.router.add_route("!stats", self.send_stats)
+
+    def cog_unload(self):
+        self.bot.router.remove_route("!stats", self.send_stats)
+
+    #only the server administrators can read the bot's metrics
+    def is_admin(self, msg):
+        permissions = getattr(msg.author, 'guild_permissions', None)
+        return permissions != None and permissions.administrator
+
+    async def send_stats(self, msg: discord.message):
+        if not self.is_admin(msg):
+            return
+        metrics = getattr(self.bot, 'metrics', None)
+        if metrics == None:
+            await msg.reply("Metrics are disabled (set metrics = yes in config.ini)")
+            return
+        await msg.reply(f"```\n{metrics.summary()[:1900]}\n```")
+
+
+def setup(bot:commands.Bot):
+    bot.add_cog(statsCommands(bot))
@@ -0,0 +1,30 @@
+"""custom_id encoding of the persistent game buttons.
+
+A persistent button carries everything needed to find or rebuild its game:
+"gd:<action>:<owner discord_id>:<session id>".
+"""
+
+CUSTOM_ID_PREFIX = "gd"
+
+
+def encode_custom_id(action, owner_id, session_id):
+    custom_id = f"{CUSTOM_ID_PREFIX}:{action}:{owner_id}:{session_id}"
+    #Discord limit for custom_id
+    if len(custom_id) > 100:
+        raise ValueError("custom_id longer than 100 characters")
+    return custom_id
+
+
+def decode_custom_id(custom_id):
+    """Split a persistent custom_id
+
+    Returns:
+
+    (action, owner_id, session_id) or None when it isn't a game button
+    """
+    if not custom_id or not custom_id.startswith(CUSTOM_ID_PREFIX + ":"):
+        return None
+    parts = custom_id.split(":")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return parts[1], int(parts[2]), parts[3]
@@ -0,0 +1,260 @@
+"""Append-only log of the battle and work events, in fixed-width binary records.
+
+Every record holds the event and the player's state right after it, so the last
+record of a player is enough to rebuild them and a dispute can be followed hit by hit.
+Records are packed on the event loop into a buffer; a writer thread appends the
+buffers to segment files and starts a new segment when one is full.
+
+Run from the repository root to read a log:
+
+    python -m game.eventlog events/
+    python -m game.eventlog events/ --player 123456789
+"""
+import argparse
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+# time, discord id, kind, monster level, level, experience, silver, health, monsters defeated, amount
+RECORD = struct.Struct('<dQBBHiiiii')
+
+HIT = 1        # the player hit the monster (amount: damage)
+HURT = 2       # the monster hit the player (amount: damage)
+KILL = 3       # the player killed the monster (amount: silver won)
+LEVEL_UP = 4
+DEATH = 5      # the player died (amount: damage of the last hit)
+WORK = 6       # work counters bought (amount: silver spent)
+WIN = 7        # the player reached the last level
+
+KIND_NAMES = {HIT: "hit", HURT: "hurt", KILL: "kill", LEVEL_UP: "level_up", DEATH: "death", WORK: "work", WIN: "win"}
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".log"
+
+
+def segment_paths(directory):
+    """Segment files of a log directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+# - - - - | EventLog Class | - - - -
+class EventLog:
+    """Writer of the event log.
+
+    record() only packs the event into the current buffer (no system call on the event
+    loop). Full buffers, and every "flush_interval" seconds the current one, are
+    appended to the segment by the writer thread.
+    """
+    def __init__(self, directory, segment_size = 64 * 2 ** 20, buffer_size = 64 * 2 ** 10, flush_interval = 0.5, clock = time.time):
+        self.directory = directory
+        #segments hold a whole number of records
+        self.segment_size = max(RECORD.size, segment_size - segment_size % RECORD.size)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        os.makedirs(directory, exist_ok = True)
+
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+
+        #every process starts a new segment, a crash never leaves a partial record in the middle of one
+        existing = segment_paths(directory)
+        self._segment_index = int(os.path.basename(existing[-1])[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if existing else 0
+        self._file = None
+        self._written = 0
+
+        #counters
+        self.records = 0
+        self.bytes_written = 0
+        self.segments = 0
+
+        self._writer = threading.Thread(target = self._run, name = "event-log-writer", daemon = True)
+        self._writer.start()
+
+    def record(self, kind, player, monster_level = 0, amount = 0):
+        """Append an event with the player's state after it
+
+        Keyword arguments:
+
+        kind = HIT, HURT, KILL, LEVEL_UP, DEATH, WORK or WIN
+
+        player = Player the event happened to
+
+        monster_level = level of the monster involved (0 for none)
+
+        amount = damage, silver won or spent (see the kinds)
+        """
+        data = RECORD.pack(
+            self.clock(), player.discord_id, kind, monster_level, player.level,
+            player.experience, player.silver, player.health, player.monsters_defeated, amount,
+        )
+        with self._lock:
+            self._buffer += data
+            self.records += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._queue.put(self._take())
+
+    def flush(self):
+        """Hand the buffered records to the writer and wait until they are written"""
+        with self._lock:
+            self._queue.put(self._take())
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            self._queue.put(self._take())
+        self._queue.put(None)
+        self._writer.join()
+
+    def _take(self):
+        buffer = self._buffer
+        self._buffer = bytearray()
+        return buffer
+
+    def _run(self):
+        while True:
+            try:
+                buffer = self._queue.get(timeout = self.flush_interval)
+            except queue.Empty:
+                with self._lock:
+                    buffer = self._take()
+                if buffer:
+                    self._write(buffer)
+                continue
+            try:
+                if buffer == None:
+                    if self._file != None:
+                        self._file.close()
+                    return
+                if buffer:
+                    self._write(buffer)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, buffer):
+        view = memoryview(buffer)
+        while view:
+            if self._file == None or self._written >= self.segment_size:
+                self._open_segment()
+            chunk = view[:self.segment_size - self._written]
+            self._file.write(chunk)
+            self._written += len(chunk)
+            self.bytes_written += len(chunk)
+            view = view[len(chunk):]
+        self._file.flush()
+
+    def _open_segment(self):
+        if self._file != None:
+            self._file.close()
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._segment_index:08d}{SEGMENT_SUFFIX}")
+        self._segment_index += 1
+        self._file = open(path, 'ab')
+        self._written = self._file.tell()
+        self.segments += 1
+
+
+# - - - - | EventReader Class | - - - -
+class EventReader:
+    """Reads the segments of a log through mmap (the records are never copied into a file buffer)"""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def records(self, player_id = None, kinds = None):
+        """Records of the log in order
+
+        Keyword arguments:
+
+        player_id = only this player's records (None for every player)
+
+        kinds = only these kinds (None for every kind)
+
+        Yields:
+
+        (time, discord_id, kind, monster_level, level, experience, silver, health, monsters_defeated, amount)
+        """
+        for path in segment_paths(self.directory):
+            size = os.path.getsize(path)
+            #a record cut by a crash at the end of a segment is skipped
+            size -= size % RECORD.size
+            if size == 0:
+                continue
+            with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for record in RECORD.iter_unpack(view[:size]):
+                        if (player_id == None or record[1] == player_id) and (kinds == None or record[2] in kinds):
+                            yield record
+                finally:
+                    view.release()
+
+    def player_state(self, player_id):
+        """The player's state after their last event
+
+        Returns:
+
+        dict of level, experience, silver, health and monsters_defeated, or None when the player has no event
+        """
+        last = None
+        for last in self.records(player_id):
+            pass
+        if last == None:
+            return None
+        return dict(zip(("level", "experience", "silver", "health", "monsters_defeated"), last[4:9]))
+
+    def players(self):
+        """State after the last event of every player (rebuild after a crash)
+
+        Returns:
+
+        dict discord_id -> (level, experience, silver, health, monsters_defeated)
+        """
+        return {record[1]: record[4:9] for record in self.records()}
+
+    def totals(self, player_id = None):
+        """Number of events and sum of their amounts, by kind
+
+        Returns:
+
+        dict kind name -> (count, amount)
+        """
+        counts = {}
+        amounts = {}
+        for record in self.records(player_id):
+            kind = record[2]
+            counts[kind] = counts.get(kind, 0) + 1
+            amounts[kind] = amounts.get(kind, 0) + record[9]
+        return {KIND_NAMES.get(kind, str(kind)): (count, amounts[kind]) for kind, count in sorted(counts.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Read a battle event log")
+    parser.add_argument("directory")
+    parser.add_argument("--player", type = int, help = "only this player's events")
+    parser.add_argument("--events", action = "store_true", help = "print every event")
+    args = parser.parse_args()
+
+    reader = EventReader(args.directory)
+    if args.events:
+        for record in reader.records(args.player):
+            moment = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record[0]))
+            print(f"{moment} {record[1]} {KIND_NAMES.get(record[2], record[2]):<8} amount {record[9]:>5} "
+                  f"monster lvl {record[3]} -> level {record[4]} xp {record[5]} silver {record[6]} health {record[7]} kills {record[8]}")
+    for name, (count, amount) in reader.totals(args.player).items():
+        print(f"{name:<9} {count:>9} events   amount {amount}")
+    if args.player != None:
+        print(f"state: {reader.player_state(args.player)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Cogs loaded on the first use of their command and code reloaded without reconnecting.
+
+The cogs of the "commands" package are found by reading their source: every
+router.add_route("!command", ...) call gives a command. Until one of its commands is
+sent, a cog is only a placeholder route; the first message loads it and is routed again.
+Cogs whose source routes no command are loaded at startup.
+
+run() watches the files. A changed cog is reloaded by py-cord (cog_unload, then setup),
+and changed game modules are re-executed in place: the values listed in their
+__reload_keep__ (the services set by configure()) are kept, and the live game objects
+(players, sessions, views and their managers, found through the services instead of a
+scan of the heap) are moved to the new classes, so games in progress keep their state,
+their message and their tick sessions.
+"""
+import ast
+import importlib
+import logging
+import os
+import sys
+from functools import partial
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+def routed_commands(path):
+    """Commands routed by a cog's source (the string literals given to add_route)
+
+    Returns:
+
+    Tuple of commands, empty when the source can't be read or routes nothing
+    """
+    try:
+        with open(path) as file:
+            tree = ast.parse(file.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        return ()
+    found = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "add_route"
+                and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            if node.args[0].value not in found:
+                found.append(node.args[0].value)
+    return tuple(found)
+
+
+def move_instances(classes, objects):
+    """Move the instances of the old classes to their new class
+
+    Keyword arguments:
+
+    classes = dict old class -> new class
+
+    objects = live objects to look at (others keep their old class)
+
+    Returns:
+
+    (instances moved, instances kept on their old class: immutable or changed layout)
+    """
+    moved = kept = 0
+    for instance in objects:
+        new = classes.get(type(instance))
+        if new == None:
+            continue
+        try:
+            instance.__class__ = new
+        except TypeError:
+            kept += 1
+            continue
+        moved += 1
+        #py-cord binds the button callbacks of a view to the functions of its class
+        for function in getattr(new, '__view_children_items__', ()):
+            item = instance.__dict__.get(function.__name__)
+            if isinstance(item, discord.ui.Item):
+                item.callback = partial(function, instance, item)
+    return moved, kept
+
+
+def reload_module(module, live_objects = None):
+    """Execute a module's new source in its own namespace and move its live objects to the new classes
+
+    A module failing to compile is left untouched, one failing to run gets its old
+    namespace back.
+
+    Keyword arguments:
+
+    live_objects = function returning the live objects to move (None to move nothing)
+
+    Returns:
+
+    (instances moved, instances kept on their old class, old namespace)
+    """
+    with open(module.__file__) as file:
+        compile(file.read(), module.__file__, 'exec')
+    old = dict(module.__dict__)
+    try:
+        importlib.reload(module)
+    except Exception:
+        module.__dict__.clear()
+        module.__dict__.update(old)
+        raise
+    for name in getattr(module, '__reload_keep__', ()):
+        if name in old:
+            setattr(module, name, old[name])
+
+    classes = {}
+    for name, value in old.items():
+        if isinstance(value, type) and value.__module__ == module.__name__:
+            new = module.__dict__.get(name)
+            if isinstance(new, type) and new is not value:
+                classes[value] = new
+    moved, kept = move_instances(classes, live_objects()) if classes and live_objects != None else (0, 0)
+    return moved, kept, old
+
+
+# - - - - | ExtensionManager Class | - - - -
+class ExtensionManager:
+    """Finds the cogs of a package, loads them lazily and reloads what changed on disk"""
+    def __init__(self, bot, package = "commands", modules = ("game.rules", "game.models", "game.views"), exclude = (), live_objects = None):
+        """
+        Keyword arguments:
+
+        package = package holding the cogs (one extension per module)
+
+        modules = game modules reloaded when they change, a module before the ones importing it
+
+        exclude = names of the cogs never loaded ("basicCommands")
+
+        live_objects = function returning the live game objects moved to the reloaded classes
+        """
+        self.bot = bot
+        self.package = package
+        self.modules = modules
+        self.exclude = set(exclude)
+        self.live_objects = live_objects
+        #commands/ has no __init__.py: a namespace package only has a __path__
+        self.directory = list(importlib.import_module(package).__path__)[0]
+
+        #extension -> commands routed to its placeholder
+        self.lazy = {}
+        #extension -> placeholder handler
+        self._placeholders = {}
+        #module name -> functions called with (module, old namespace) after a reload
+        self._hooks = {}
+        #path -> mtime seen
+        self._mtimes = {}
+
+        #counters
+        self.loads = 0
+        self.reloads = 0
+        self.failures = 0
+
+    def on_reload(self, module_name, callback):
+        """Call callback(module, old namespace) after the module was reloaded (routes and wrappers to move)"""
+        self._hooks.setdefault(module_name, []).append(callback)
+
+    def cog_paths(self):
+        """extension name -> source path of the package's cogs"""
+        paths = {}
+        for entry in sorted(os.scandir(self.directory), key = lambda entry: entry.name):
+            name, extension = os.path.splitext(entry.name)
+            if extension == ".py" and not name.startswith("_") and name not in self.exclude and entry.is_file():
+                paths[f"{self.package}.{name}"] = entry.path
+        return paths
+
+    def discover(self):
+        """Route a placeholder for every command of the cogs not loaded yet (cogs routing nothing are loaded now)
+        """
+        for name, path in self.cog_paths().items():
+            self._mtimes[path] = os.stat(path).st_mtime
+            if name not in self.bot.extensions and name not in self.lazy:
+                self._add_lazy(name, path)
+        for module_name in self.modules:
+            module = importlib.import_module(module_name)
+            self._mtimes[module.__file__] = os.stat(module.__file__).st_mtime
+
+    def load(self, name):
+        """Load an extension now (its placeholder routes are dropped first)
+
+        Returns:
+
+        False when loading failed (the placeholder stays for the next message)
+        """
+        placeholder = self._placeholders.pop(name, None)
+        commands = self.lazy.pop(name, ())
+        for command in commands:
+            self.bot.router.remove_route(command, placeholder)
+        try:
+            self.bot.load_extension(name)
+        except discord.ExtensionError:
+            log.exception("Loading %s failed", name)
+            self.failures += 1
+            if placeholder != None:
+                self._route_placeholder(name, commands, placeholder)
+            return False
+        self.loads += 1
+        log.info("Loaded %s", name)
+        return True
+
+    def check(self):
+        """Reload the changed cogs and game modules, route the new cogs, unload the deleted ones
+
+        Returns:
+
+        Names of the extensions and modules reloaded
+        """
+        reloaded = []
+        paths = self.cog_paths()
+        for name, path in paths.items():
+            mtime = os.stat(path).st_mtime
+            if self._mtimes.get(path) == mtime:
+                continue
+            self._mtimes[path] = mtime
+            if name in self.bot.extensions:
+                if self._reload_extension(name):
+                    reloaded.append(name)
+            else:
+                #new cog, or a lazy one whose commands may have changed
+                self._remove_lazy(name)
+                self._add_lazy(name, path)
+
+        for name in [name for name in self.bot.extensions if name.startswith(self.package + ".") and name not in paths]:
+            self.bot.unload_extension(name)
+            log.info("Unloaded %s (source removed)", name)
+        for name in [name for name in self.lazy if name not in paths]:
+            self._remove_lazy(name)
+
+        #a module is reloaded with every module after it, which may use its values at import time
+        changed = False
+        for module_name in self.modules:
+            module = sys.modules.get(module_name)
+            if module == None:
+                continue
+            mtime = os.stat(module.__file__).st_mtime
+            if self._mtimes.get(module.__file__) != mtime:
+                self._mtimes[module.__file__] = mtime
+                changed = True
+            if changed:
+                if not self._reload_module(module):
+                    break
+                reloaded.append(module_name)
+        return reloaded
+
+    async def run(self, interval = 2.0):
+        """Check the files every "interval" seconds (tick engine session)"""
+        while True:
+            try:
+                self.check()
+            except Exception:
+                log.exception("Extension check failed")
+            yield interval
+
+    def _reload_extension(self, name):
+        try:
+            self.bot.reload_extension(name)
+        except discord.ExtensionError:
+            #py-cord puts the previous version back
+            log.exception("Reloading %s failed, the previous version stays loaded", name)
+            self.failures += 1
+            return False
+        self.reloads += 1
+        log.info("Reloaded %s", name)
+        return True
+
+    def _reload_module(self, module):
+        try:
+            moved, kept, old = reload_module(module, self.live_objects)
+            for callback in self._hooks.get(module.__name__, ()):
+                callback(module, old)
+        except Exception:
+            log.exception("Reloading %s failed, the previous version stays loaded", module.__name__)
+            self.failures += 1
+            return False
+        self.reloads += 1
+        log.info("Reloaded %s (%d live objects moved to the new classes, %d kept)", module.__name__, moved, kept)
+        return True
+
+    def _add_lazy(self, name, path):
+        commands = routed_commands(path)
+        if not commands:
+            #nothing to wait for: listeners and slash commands need the cog loaded
+            self.load(name)
+            return
+
+        async def placeholder(msg):
+            if self.load(name):
+                await self.bot.router.dispatch(msg)
+
+        self._route_placeholder(name, commands, placeholder)
+
+    def _route_placeholder(self, name, commands, placeholder):
+        self.lazy[name] = commands
+        self._placeholders[name] = placeholder
+        for command in commands:
+            self.bot.router.add_route(command, placeholder)
+
+    def _remove_lazy(self, name):
+        placeholder = self._placeholders.pop(name, None)
+        for command in self.lazy.pop(name, ()):
+            self.bot.router.remove_route(command, placeholder)
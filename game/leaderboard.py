@@ -0,0 +1,322 @@
+import asyncio
+import random
+
+# Number of levels of the skiplists (enough for 2**24 players per board)
+MAX_LEVELS = 24
+
+# Player values each board ranks by (highest first, the next values break ties)
+BOARDS = {
+    "level": lambda player: (player.level, player.experience),
+    "silver": lambda player: (player.silver,),
+    "kills": lambda player: (player.monsters_defeated,),
+}
+
+BOARD_TITLES = {
+    "level": "Level",
+    "silver": "Silver",
+    "kills": "Monsters Defeated",
+}
+
+
+class _Last:
+    """Value of the skiplist end node, greater than any key"""
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __ge__(self, other):
+        return True
+
+
+class _Node:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width
+
+
+_END = _Node(_Last(), [], [])
+
+def _random_levels():
+    #number of levels a node is linked on (half as many nodes on each level up):
+    #1 + the trailing zero bits of a random number
+    bits = random.getrandbits(MAX_LEVELS - 1) | (1 << (MAX_LEVELS - 1))
+    return (bits & -bits).bit_length()
+
+# - - - - | IndexableSkiplist Class | - - - -
+class IndexableSkiplist:
+    """Sorted list of unique values with O(log n) insert, remove and rank.
+
+    Each link also stores how many values it skips, so the position of a value is
+    the sum of the widths walked to reach it.
+    """
+    def __init__(self, values = ()):
+        """values = sorted unique values to start with (linked in O(n))"""
+        self.size = 0
+        self.head = _Node(None, [_END] * MAX_LEVELS, [1] * MAX_LEVELS)
+
+        #last node linked on each level and its position (the head is position 0)
+        last = [self.head] * MAX_LEVELS
+        last_position = [0] * MAX_LEVELS
+        for position, value in enumerate(values, 1):
+            levels = _random_levels()
+            node = _Node(value, [_END] * levels, [None] * levels)
+            for level in range(levels):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+            self.size = position
+        for level in range(MAX_LEVELS):
+            last[level].width[level] = self.size + 1 - last_position[level]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not _END:
+            yield node.value
+            node = node.next[0]
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node = self.head
+        index += 1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        #last node before the value on each level and the distance walked on it
+        chain = [None] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = _random_levels()
+        new = _Node(value, [None] * levels, [None] * levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        found = chain[0].next[0]
+        if found is _END or found.value != value:
+            raise KeyError(value)
+
+        for level in range(len(found.next)):
+            previous = chain[level]
+            previous.width[level] += found.width[level] - 1
+            previous.next[level] = found.next[level]
+        for level in range(len(found.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def index(self, value):
+        """Position of the value (number of smaller values), without walking the list
+        """
+        steps = 0
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value < value:
+                steps += node.width[level]
+                node = node.next[level]
+        found = node.next[0]
+        if found is _END or found.value != value:
+            raise KeyError(value)
+        return steps
+
+    def head_values(self, count):
+        """The first "count" values, in O(count)"""
+        values = []
+        node = self.head.next[0]
+        while node is not _END and len(values) < count:
+            values.append(node.value)
+            node = node.next[0]
+        return values
+
+
+# - - - - | Leaderboard Class | - - - -
+class Leaderboard:
+    """Rankings of every board, global and per guild, updated one player at a time.
+
+    A player ranks in the guild where they last played. Keys are the negated board
+    values followed by the discord id, so the skiplists keep the best players first
+    and every key is unique.
+    """
+    def __init__(self, names = None):
+        """names = function returning the name of a discord id (names are only looked up for
+        the players shown, instead of keeping one per ranked player)"""
+        self.names = names
+        self._global = {board: IndexableSkiplist() for board in BOARDS}
+        #guild_id -> {board: IndexableSkiplist}
+        self._guilds = {}
+        #discord_id -> (guild_id, {board: key})
+        self._players = {}
+
+        #counters
+        self.updates = 0
+        self.unchanged = 0
+
+    def __len__(self):
+        return len(self._players)
+
+    def update(self, player, guild_id = None):
+        """Move the player to its current place on every board
+
+        Keyword arguments:
+
+        player = Player whose values changed
+
+        guild_id = guild of the player (None keeps the previous one)
+        """
+        entry = self._players.get(player.discord_id)
+        if guild_id == None:
+            guild_id = entry[0] if entry != None else getattr(player, 'guild_id', None)
+        keys = {board: tuple(-value for value in values(player)) + (player.discord_id,) for board, values in BOARDS.items()}
+        if entry != None and entry[0] == guild_id and entry[1] == keys:
+            self.unchanged += 1
+            return
+
+        self.updates += 1
+        old_guild = self._guild_lists(entry[0]) if entry != None else None
+        guild = self._guild_lists(guild_id)
+        for board, key in keys.items():
+            if entry != None:
+                old_key = entry[1][board]
+                if old_key == key and entry[0] == guild_id:
+                    continue
+                if old_key != key:
+                    self._global[board].remove(old_key)
+                    self._global[board].insert(key)
+                if old_guild != None:
+                    old_guild[board].remove(old_key)
+            else:
+                self._global[board].insert(key)
+            if guild != None:
+                guild[board].insert(key)
+        self._players[player.discord_id] = (guild_id, keys)
+
+    def remove(self, discord_id):
+        entry = self._players.pop(discord_id, None)
+        if entry == None:
+            return
+        guild = self._guild_lists(entry[0])
+        for board, key in entry[1].items():
+            self._global[board].remove(key)
+            if guild != None:
+                guild[board].remove(key)
+
+    def load(self, players):
+        """Rank many players (startup, refresh from the database)
+
+        An empty leaderboard is built by sorting the keys once instead of one insert per player.
+        """
+        if self._players:
+            for player in players:
+                #the saved guild wins: the player may have moved to a guild of another process
+                self.update(player, player.guild_id)
+            return
+
+        guild_keys = {}
+        for player in players:
+            keys = {board: tuple(-value for value in values(player)) + (player.discord_id,) for board, values in BOARDS.items()}
+            self._players[player.discord_id] = (player.guild_id, keys)
+            if player.guild_id != None:
+                guild_keys.setdefault(player.guild_id, []).append(keys)
+        self.updates += len(self._players)
+
+        entries = [entry[1] for entry in self._players.values()]
+        self._global = {board: IndexableSkiplist(sorted(keys[board] for keys in entries)) for board in BOARDS}
+        self._guilds = {
+            guild_id: {board: IndexableSkiplist(sorted(keys[board] for keys in entries)) for board in BOARDS}
+            for guild_id, entries in guild_keys.items()
+        }
+
+    def top(self, board, count = 10, guild_id = None):
+        """Best players of a board
+
+        Returns:
+
+        List of (rank, discord_id, name, values)
+        """
+        ranking = self._ranking(board, guild_id)
+        if ranking == None:
+            return []
+        return [
+            (rank, key[-1], self.names(key[-1]) if self.names != None else None, tuple(-value for value in key[:-1]))
+            for rank, key in enumerate(ranking.head_values(count), 1)
+        ]
+
+    def rank(self, board, discord_id, guild_id = None):
+        """Place of a player on a board
+
+        Returns:
+
+        (rank, number of ranked players, values) or None when the player isn't ranked there
+        """
+        entry = self._players.get(discord_id)
+        ranking = self._ranking(board, guild_id)
+        if entry == None or ranking == None or (guild_id != None and entry[0] != guild_id):
+            return None
+        key = entry[1][board]
+        return ranking.index(key) + 1, len(ranking), tuple(-value for value in key[:-1])
+
+    async def run(self, store, interval = 300, batch = 10000):
+        """Tick engine session reloading the players saved by the other processes
+
+        Yields:
+
+        0 between two batches of players (the game keeps running meanwhile), then the interval
+        """
+        while True:
+            rows = await asyncio.to_thread(store.read_all)
+            for count, player in enumerate(store.all_players(rows), 1):
+                #the saved guild wins: the player may have moved to a guild of another process
+                self.update(player, player.guild_id)
+                if count % batch == 0:
+                    yield 0
+            yield interval
+
+    def _ranking(self, board, guild_id):
+        if guild_id == None:
+            return self._global[board]
+        guild = self._guilds.get(guild_id)
+        return guild[board] if guild != None else None
+
+    def _guild_lists(self, guild_id):
+        if guild_id == None:
+            return None
+        guild = self._guilds.get(guild_id)
+        if guild == None:
+            guild = self._guilds[guild_id] = {board: IndexableSkiplist() for board in BOARDS}
+        return guild
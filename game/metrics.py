@@ -0,0 +1,311 @@
+"""Counters, latency histograms and gauges of the bot, served in the Prometheus text format.
+
+Nothing is measured until instrument() wraps a method: with metrics disabled the game
+code is left untouched, so a disabled call costs nothing at all.
+"""
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PREFIX = "gamediscord"
+
+# py-cord sleeps and retries a 429 by itself, it only logs a warning from these loggers
+RATE_LIMIT_LOGGERS = ("discord.http", "discord.webhook.async_")
+RATE_LIMIT_MESSAGES = ("We are being rate limited.", "is rate limited.")
+
+# - - - - | Histogram Class | - - - -
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds = LATENCY_BUCKETS):
+        self.bounds = bounds
+        #one count per bucket plus the values above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the quantile (inf when above the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+# - - - - | RateLimitCounter Class | - - - -
+class RateLimitCounter(logging.Handler):
+    """Counts the 429 responses py-cord logs and the seconds it waited before retrying"""
+    def __init__(self, metrics):
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+
+    def emit(self, record):
+        if not isinstance(record.msg, str) or not any(message in record.msg for message in RATE_LIMIT_MESSAGES):
+            return
+        self.metrics.count("discord_rate_limited")
+        #the retry_after argument is the only float of both messages
+        retry_after = next((arg for arg in record.args or () if isinstance(arg, float)), None)
+        if retry_after != None:
+            self.metrics.histogram("rate_limit_wait_seconds", "webhook" if "webhook" in record.name else "http").observe(retry_after)
+
+
+# - - - - | Metrics Class | - - - -
+class Metrics:
+    """Registry of the bot's measurements.
+
+    Histograms are grouped in families with one label ("handler", "edit", ...), gauges
+    are functions read when the metrics are rendered.
+    """
+    def __init__(self, clock = time.perf_counter):
+        self.clock = clock
+        self.started = time.monotonic()
+        self.counters = {}
+        #(family, label) -> Histogram
+        self.histograms = {}
+        #name -> (help, function)
+        self.gauges = {}
+        self._server = None
+        self._lag_task = None
+        self._rate_limit_counter = None
+
+    def count(self, name, amount = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def histogram(self, family, label):
+        histogram = self.histograms.get((family, label))
+        if histogram == None:
+            histogram = self.histograms[(family, label)] = Histogram()
+        return histogram
+
+    def gauge(self, name, function, help = ""):
+        self.gauges[name] = (help, function)
+
+    def instrument(self, owner, attribute, label = None):
+        """Replace owner.attribute with a version timing every call in the "handler_seconds" family
+
+        Coroutine functions are timed until they return, async generators (tick sessions)
+        one step at a time and plain functions per call.
+
+        Keyword arguments:
+
+        owner = class or module holding the function
+
+        attribute = name of the function
+
+        label = handler label (attribute name by default)
+        """
+        function = getattr(owner, attribute)
+        histogram = self.histogram("handler_seconds", label or attribute)
+        clock = self.clock
+
+        if inspect.isasyncgenfunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                steps = function(*args, **kwargs)
+                started = clock()
+                try:
+                    async for value in steps:
+                        histogram.observe(clock() - started)
+                        yield value
+                        started = clock()
+                finally:
+                    await steps.aclose()
+        elif inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(clock() - started)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.observe(clock() - started)
+
+        wrapper.__wrapped__ = function
+        setattr(owner, attribute, wrapper)
+        return wrapper
+
+    def instrument_edits(self, scheduler_class):
+        """Time the message edits of every EditScheduler and count the sent ones and the ones
+        slowed down by py-cord's rate limiter
+        """
+        send = scheduler_class._send
+        histogram = self.histogram("edit_seconds", "interaction.edit")
+        clock = self.clock
+        metrics = self
+        self.counters.setdefault("edits_sent", 0)
+        self.counters.setdefault("edits_rate_limited", 0)
+
+        @functools.wraps(send)
+        async def wrapper(scheduler):
+            sent, limited = scheduler.edits_sent, scheduler.rate_limited
+            started = clock()
+            try:
+                return await send(scheduler)
+            finally:
+                if scheduler.edits_sent != sent:
+                    histogram.observe(clock() - started)
+                    metrics.count("edits_sent")
+                if scheduler.rate_limited != limited:
+                    metrics.count("edits_rate_limited")
+
+        wrapper.__wrapped__ = send
+        scheduler_class._send = wrapper
+
+    def count_rate_limits(self, loggers = RATE_LIMIT_LOGGERS):
+        """Count the 429 responses of every Discord request (py-cord logs them as warnings)
+        """
+        if self._rate_limit_counter != None:
+            return
+        self._rate_limit_counter = RateLimitCounter(self)
+        self.counters.setdefault("discord_rate_limited", 0)
+        for name in loggers:
+            logging.getLogger(name).addHandler(self._rate_limit_counter)
+
+    async def watch_loop_lag(self, interval = 0.5):
+        """Measure how late the event loop wakes up from its sleeps (runs until cancelled)"""
+        loop = asyncio.get_running_loop()
+        histogram = self.histogram("loop_lag_seconds", "loop")
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            histogram.observe(max(0.0, loop.time() - start - interval))
+
+    def start(self, host = "127.0.0.1", port = 0, lag_interval = 0.5):
+        """Start the loop lag monitor and, when a port is given, the HTTP endpoint (needs a running loop)
+        """
+        if self._lag_task == None:
+            self._lag_task = asyncio.get_running_loop().create_task(self.watch_loop_lag(lag_interval))
+        if port and self._server == None:
+            self._server = asyncio.get_running_loop().create_task(self._serve(host, port))
+
+    def render(self):
+        """All the metrics in the Prometheus text exposition format"""
+        lines = [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds {time.monotonic() - self.started:.3f}"]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, (help, function) in sorted(self.gauges.items()):
+            if help:
+                lines.append(f"# HELP {PREFIX}_{name} {help}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {function()}")
+
+        families = {}
+        for (family, label), histogram in sorted(self.histograms.items()):
+            families.setdefault(family, []).append((label, histogram))
+        for family, histograms in families.items():
+            name = f"{PREFIX}_{family}"
+            label_name = "handler" if family == "handler_seconds" else "name"
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short text report (the !stats command)"""
+        uptime = max(1e-9, time.monotonic() - self.started)
+        lines = [f"uptime {uptime:.0f}s"]
+        for name, (_, function) in sorted(self.gauges.items()):
+            lines.append(f"{name}: {function()}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value} ({value / uptime:.2f}/s)")
+        for (family, label), histogram in sorted(self.histograms.items()):
+            if histogram.count:
+                lines.append(
+                    f"{label} ({family}): n={histogram.count} "
+                    f"p50<={histogram.quantile(0.5) * 1e3:g}ms p99<={histogram.quantile(0.99) * 1e3:g}ms"
+                )
+        return "\n".join(lines)
+
+    async def _serve(self, host, port):
+        server = await asyncio.start_server(self._handle_http, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request = await reader.readline()
+            #the headers are read and ignored
+            while (await reader.readline()).strip():
+                pass
+            path = request.split()[1] if len(request.split()) > 1 else b"/"
+            if path == b"/metrics":
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def instrument_game(metrics, engine, registry):
+    """Wrap the game's hot paths and register its gauges
+
+    Keyword arguments:
+
+    engine = TickEngine of the hunt and work sessions
+
+    registry = SessionRegistry of the live games
+    """
+    from game.render import EditScheduler
+
+    instrument_views(metrics)
+    metrics.instrument_edits(EditScheduler)
+    metrics.count_rate_limits()
+
+    metrics.gauge("active_hunts", lambda: engine.count_sessions("hunting_loop"), "hunt sessions in the tick engine")
+    metrics.gauge("active_works", lambda: engine.count_sessions("work_counter", "work_fast_forward"), "work sessions in the tick engine")
+    metrics.gauge("tick_sessions", lambda: len(engine), "sessions in the tick engine")
+    metrics.gauge("games", lambda: len(registry), "games in the session registry")
+    for name, help in (("evicted", "idle games closed"), ("leaked", "closed games still referenced"),
+                       ("rejected", "games refused by the session caps"), ("replaced", "games replaced by a new !bot")):
+        metrics.gauge(f"sessions_{name}", lambda name = name: registry.metrics()[name], help)
+
+
+def instrument_views(metrics):
+    """Wrap the handlers and battle steps of the game views (again after game.views is reloaded)"""
+    from game import views
+
+    metrics.instrument(views.ButtonManager, 'start_hunting')
+    metrics.instrument(views.ButtonManager, 'start_work')
+    metrics.instrument(views.ButtonManager, 'stop_hunting')
+    metrics.instrument(views.ButtonManager, 'stop_work')
+    metrics.instrument(views.HuntingManager, 'battle')
+    metrics.instrument(views.HuntingManager, 'party_battle')
+    metrics.instrument(views.Workstation, 'work_counter')
+    metrics.instrument(views.Workstation, 'work_fast_forward')
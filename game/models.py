@@ -0,0 +1,42 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from game import rules
+
+class Player:
+    def __init__(self,discord_id,user_name):
+        self.discord_id = discord_id
+        self.name = user_name
+        self.level = 1
+        self.experience = 0
+        self.silver = 0
+        self.max_health = rules.PLAYER_MAX_HEALTH
+        self.health = rules.PLAYER_MAX_HEALTH
+        self.monsters_defeated = 0
+        #guild where the player last played (leaderboard scope)
+        self.guild_id = None
+
+# Immutable monster data shared by every session
+MonsterTemplate = namedtuple('MonsterTemplate', ['name', 'level', 'max_health'])
+
+def monster_template(monster_name,monster_level):
+    return MonsterTemplate(monster_name, monster_level, rules.monster_max_health(monster_level))
+
+# Monster catalog indexed by level (rat, boar, goblin)
+MONSTER_CATALOG = MappingProxyType({
+    template.level: template for template in (
+        monster_template('Rat',1),
+        monster_template('Boar',2),
+        monster_template('Goblin',3),
+    )
+})
+
+class Monster:
+    __slots__ = ('name', 'level', 'max_health', 'health')
+
+    def __init__(self,template,max_health = None):
+        self.name = template.name
+        self.level = template.level
+        #the guild's settings may change the catalog's health
+        self.max_health = template.max_health if max_health == None else max_health
+        self.health = self.max_health
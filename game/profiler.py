@@ -0,0 +1,312 @@
+"""Sampling profiler captured on demand while the bot runs.
+
+Nothing is installed until capture() is called (no thread, no hook, no wrapper), so the
+profiler costs nothing between captures and stays in production. During a capture:
+
+- a thread reads the stack of the event loop thread every "interval" seconds
+  (sys._current_frames): what the loop spends its time on;
+- a task on the loop walks the await chain of every asyncio task and the suspended
+  frames of every tick engine session every "await_interval" seconds: where the
+  coroutines wait.
+
+Samples are attributed to their asyncio task and to the game (guild and player) of the
+tick session on the stack, and written as collapsed stacks (flamegraph.pl, speedscope,
+inferno) plus a text summary.
+"""
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import types
+
+from game.ticks import TickEngine
+
+# Frames above Handle._run (the callback being run) are the loop's own machinery
+HANDLE_RUN = asyncio.events.Handle._run.__code__
+RUN_ONCE = asyncio.base_events.BaseEventLoop._run_once.__code__
+ENGINE_STEP = TickEngine._step.__code__
+
+# The C future iterator stands for the future awaited
+AWAITED_NAMES = {"FutureIter": "Future"}
+
+# Leaf of a tick session waiting for its next step, and of a coroutine scheduled to run
+TICK_DELAY = "<tick delay>"
+READY = "<ready>"
+
+ASYNCIO_DIRECTORY = os.path.dirname(asyncio.__file__)
+
+
+def frame_name(code):
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def session_label(session):
+    """Root of the samples of a tick engine session: "guild:<id>;player:<id>" for a game
+
+    A session timed by Metrics.instrument is a wrapper iterating the game's generator
+    (its "steps" local), the game manager is found on that generator's frame.
+    """
+    frame = getattr(session, 'ag_frame', None)
+    owner = None
+    while frame != None:
+        local_values = frame.f_locals
+        owner = local_values.get('self')
+        if owner != None:
+            break
+        frame = getattr(local_values.get('steps'), 'ag_frame', None)
+    player = getattr(getattr(owner, 'state', None), 'player', None)
+    if player == None:
+        return f"engine:{getattr(session, '__name__', type(session).__name__)}"
+    return f"guild:{player.guild_id};player:{player.discord_id}"
+
+
+def suspended_chain(awaitable):
+    """Code objects of a suspended coroutine or async generator and of what it waits on, outermost first
+
+    An async generator suspended at a yield inside "async for" waits on the generator it
+    iterates (hunting_loop on hunt_timer), which is only referenced by its frame's stack
+    (found through the generator's gc referents).
+
+    Returns:
+
+    (codes, leaf) where leaf names the future or object awaited (None when unknown)
+    """
+    codes = []
+    while awaitable != None:
+        if isinstance(awaitable, types.CoroutineType):
+            frame, awaited = awaitable.cr_frame, awaitable.cr_await
+        elif isinstance(awaitable, types.AsyncGeneratorType):
+            frame, awaited = awaitable.ag_frame, awaitable.ag_await
+            if frame != None and awaited == None:
+                awaited = next((referent for referent in gc.get_referents(awaitable)
+                                if isinstance(referent, types.AsyncGeneratorType) and referent.ag_frame != None), None)
+        elif isinstance(awaitable, types.GeneratorType):
+            frame, awaited = awaitable.gi_frame, awaitable.gi_yieldfrom
+        else:
+            name = type(awaitable).__name__
+            return codes, f"<{AWAITED_NAMES.get(name, name)}>"
+        if frame == None:
+            break
+        codes.append(frame.f_code)
+        awaitable = awaited
+    return codes, None
+
+
+# - - - - | Capture Class | - - - -
+class Capture:
+    """Samples of one capture, counted by stack and by task, session and coroutine"""
+    def __init__(self, seconds, interval, await_interval):
+        self.seconds = seconds
+        self.interval = interval
+        self.await_interval = await_interval
+        self.started = time.time()
+        #seconds the loop spent taking the await samples (the cost of the capture on the loop)
+        self.overhead = 0.0
+        self.loop_samples = 0
+        self.await_rounds = 0
+
+        #collapsed stack -> samples
+        self.loop_stacks = {}
+        self.await_stacks = {}
+        #root (session or task) -> samples
+        self.loop_by_root = {}
+        self.loop_by_task = {}
+        #(coroutine, what it waits on) -> samples
+        self.await_by_coroutine = {}
+        self.await_by_session = {}
+
+        self._names = {}
+
+    def name(self, code):
+        if isinstance(code, str):
+            return code
+        name = self._names.get(code)
+        if name == None:
+            name = self._names[code] = frame_name(code)
+        return name
+
+    def add_loop_sample(self, root, task, codes):
+        stack = ";".join([root] + [self.name(code) for code in codes])
+        self.loop_stacks[stack] = self.loop_stacks.get(stack, 0) + 1
+        self.loop_by_root[root] = self.loop_by_root.get(root, 0) + 1
+        self.loop_by_task[task] = self.loop_by_task.get(task, 0) + 1
+        self.loop_samples += 1
+
+    def add_await_sample(self, root, codes, leaf):
+        names = [self.name(code) for code in codes]
+        if leaf != None:
+            names.append(leaf)
+        stack = ";".join([root] + names)
+        self.await_stacks[stack] = self.await_stacks.get(stack, 0) + 1
+        #await time goes to the innermost coroutine outside asyncio (start_game, not sleep)
+        own = [code for code in codes if not code.co_filename.startswith(ASYNCIO_DIRECTORY)]
+        owner = own[-1] if own else (codes[-1] if codes else None)
+        awaited = leaf or READY
+        if codes and codes[-1] is not owner:
+            awaited = f"{self.name(codes[-1])} {awaited}"
+        coroutine = (self.name(owner) if owner != None else "?", awaited)
+        self.await_by_coroutine[coroutine] = self.await_by_coroutine.get(coroutine, 0) + 1
+        if root.startswith("guild:"):
+            self.await_by_session[root] = self.await_by_session.get(root, 0) + 1
+
+    def summary(self, top = 10):
+        """Text report: loop time by session and task, await time by coroutine and session"""
+        lines = [
+            f"capture of {self.seconds:g}s at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))}: "
+            f"{self.loop_samples} loop samples every {self.interval * 1e3:g}ms, "
+            f"{self.await_rounds} await rounds every {self.await_interval * 1e3:g}ms "
+            f"(cost on the loop {self.overhead * 1e3:.1f}ms)",
+            "",
+            "loop time by session / task (estimated seconds):",
+        ]
+        lines += self._table(self.loop_by_root, self.interval, top)
+        lines += ["", "loop time by task coroutine:"]
+        lines += self._table(self.loop_by_task, self.interval, top)
+        lines += ["", "await time by coroutine -> awaited (estimated seconds, summed over the coroutines):"]
+        lines += self._table({f"{coroutine} -> {leaf}": count for (coroutine, leaf), count in self.await_by_coroutine.items()}, self.await_interval, top)
+        lines += ["", "await time by session:"]
+        lines += self._table(self.await_by_session, self.await_interval, top)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _table(counts, weight, top):
+        rows = sorted(counts.items(), key = lambda item: item[1], reverse = True)[:top]
+        return [f"  {count * weight:9.3f}s  {count:>7}  {key}" for key, count in rows] or ["  (no samples)"]
+
+    def write(self, directory):
+        """Write <stamp>-loop.folded, <stamp>-await.folded and <stamp>-summary.txt
+
+        Returns:
+
+        List of the paths written
+        """
+        os.makedirs(directory, exist_ok = True)
+        stamp = "profile-" + time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        paths = []
+        for suffix, stacks in (("loop.folded", self.loop_stacks), ("await.folded", self.await_stacks)):
+            path = os.path.join(directory, f"{stamp}-{suffix}")
+            with open(path, 'w') as file:
+                for stack, count in sorted(stacks.items()):
+                    file.write(f"{stack} {count}\n")
+            paths.append(path)
+        path = os.path.join(directory, f"{stamp}-summary.txt")
+        with open(path, 'w') as file:
+            file.write(self.summary(top = 50) + "\n")
+        paths.append(path)
+        return paths
+
+
+# - - - - | SamplingProfiler Class | - - - -
+class SamplingProfiler:
+    """Captures the event loop and the game coroutines for a bounded window (one capture at a time)"""
+    def __init__(self, engine, directory = "profiles", max_seconds = 60, interval = 0.005, await_interval = 0.1):
+        self.engine = engine
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.interval = interval
+        self.await_interval = await_interval
+        self.current = None
+
+        #outer frame of every tick session -> (frame, root), refreshed by the await sampler
+        self._session_frames = {}
+
+    @property
+    def active(self):
+        return self.current != None
+
+    async def capture(self, seconds):
+        """Sample the loop and the coroutines for "seconds" (capped at max_seconds) and write the results
+
+        Returns:
+
+        (Capture, paths written)
+        """
+        if self.active:
+            raise RuntimeError("a capture is already running")
+        loop = asyncio.get_running_loop()
+        capture = self.current = Capture(min(seconds, self.max_seconds), self.interval, self.await_interval)
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target = self._sample_loop_thread, args = (capture, loop, threading.get_ident(), stop),
+            name = "profiler-sampler", daemon = True,
+        )
+        try:
+            self._refresh_sessions()
+            sampler.start()
+            until = loop.time() + capture.seconds
+            while loop.time() < until:
+                self._sample_awaits(capture)
+                await asyncio.sleep(min(self.await_interval, max(0.0, until - loop.time())))
+        finally:
+            stop.set()
+            if sampler.is_alive():
+                sampler.join()
+            self._session_frames = {}
+            self.current = None
+        paths = await loop.run_in_executor(None, capture.write, self.directory)
+        return capture, paths
+
+    def _refresh_sessions(self):
+        frames = {}
+        for session in list(self.engine._sessions):
+            frame = getattr(session, 'ag_frame', None)
+            if frame != None:
+                frames[id(frame)] = (frame, session_label(session))
+        #swapped in one assignment, the sampler thread reads either map
+        self._session_frames = frames
+
+    def _sample_awaits(self, capture):
+        """One round of await samples (runs on the loop)"""
+        started = time.perf_counter()
+        self._refresh_sessions()
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is current:
+                continue
+            coro = task.get_coro()
+            if getattr(coro, 'cr_code', None) is ENGINE_STEP and coro.cr_frame != None:
+                #a tick engine batch stepping a session: follow the session itself
+                session = coro.cr_frame.f_locals.get('session')
+                codes, leaf = suspended_chain(session)
+                capture.add_await_sample(session_label(session), [ENGINE_STEP] + codes, leaf)
+            else:
+                codes, leaf = suspended_chain(coro)
+                capture.add_await_sample(f"task:{getattr(coro, '__qualname__', type(coro).__name__)}", codes, leaf)
+        for session in list(self.engine._sessions):
+            #running sessions are stepped by a task (sampled above)
+            if not session.ag_running and session.ag_frame != None:
+                codes = suspended_chain(session)[0]
+                capture.add_await_sample(session_label(session), codes, TICK_DELAY)
+        capture.await_rounds += 1
+        capture.overhead += time.perf_counter() - started
+
+    def _sample_loop_thread(self, capture, loop, thread_id, stop):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            codes = []
+            root = None
+            running = False
+            while frame != None:
+                code = frame.f_code
+                if code is HANDLE_RUN:
+                    running = True
+                    break
+                if code is RUN_ONCE:
+                    break
+                if root == None:
+                    entry = self._session_frames.get(id(frame))
+                    if entry != None and entry[0] is frame:
+                        root = entry[1]
+                codes.append(code)
+                frame = frame.f_back
+            codes.reverse()
+            if not running:
+                #between two callbacks: selecting (idle) or scheduling
+                capture.add_loop_sample("loop", "loop", codes)
+                continue
+            task = asyncio.current_task(loop)
+            coro = task.get_coro() if task != None else None
+            task_name = f"task:{getattr(coro, '__qualname__', type(coro).__name__)}" if coro != None else "callback"
+            capture.add_loop_sample(root or task_name, task_name, codes)
@@ -0,0 +1,47 @@
+"""Gateway profiles: which events the bot asks Discord for and what py-cord keeps in memory.
+
+"full" is the original setup (every intent, every cache). "lean" only asks for what the
+game reads: guilds, guild messages and their content. The author of a message and the
+user of an interaction come with their own payload (nickname included), so no member
+list, member chunk or presence update is needed and the member cache stays empty.
+"""
+import discord
+
+PROFILES = ("full", "lean")
+
+# Messages kept by py-cord in the lean profile (the game never looks a message up by id)
+LEAN_MAX_MESSAGES = 100
+
+
+def lean_intents():
+    return discord.Intents(guilds = True, guild_messages = True, message_content = True)
+
+
+def bot_options(profile = "full", max_messages = None):
+    """Keyword arguments of commands.Bot for a profile
+
+    Keyword arguments:
+
+    profile = "full" or "lean"
+
+    max_messages = size of the message cache (None for the profile's default, 0 to disable it)
+
+    Returns:
+
+    dict of options
+    """
+    if profile == "full":
+        options = {"intents": discord.Intents.all()}
+    elif profile == "lean":
+        options = {
+            "intents": lean_intents(),
+            "max_messages": LEAN_MAX_MESSAGES,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "chunk_guilds_at_startup": False,
+        }
+    else:
+        raise ValueError(f"unknown profile {profile!r}, expected one of {', '.join(PROFILES)}")
+
+    if max_messages != None:
+        options["max_messages"] = max_messages or None
+    return options
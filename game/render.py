@@ -0,0 +1,150 @@
+import asyncio
+
+# - - - - | EditScheduler Class | - - - -
+class EditScheduler:
+    """Coalesces the edits of one message so Discord sees at most one edit per interval.
+
+    Pending "embed"/"view" changes are merged into the latest state, edits whose payload
+    did not change are skipped (an interaction not answered yet is deferred instead).
+
+    py-cord handles a 429 itself: it sleeps the "retry_after" Discord sent and retries, so
+    the edit returns late instead of raising. An edit slower than "slow_edit" seconds is
+    counted as rate limited and the message backs off by the time it took.
+    """
+    def __init__(self, interval = 1.0, max_backoff = 30.0, slow_edit = None):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        #seconds after which an edit was held back by py-cord's rate limiter
+        self.slow_edit = interval if slow_edit == None else slow_edit
+
+        #interaction used to edit the message (the latest one wins)
+        self.target = None
+        self._pending = {}
+        self._last_payload = {}
+        self._last_sent = None
+        self._backoff = 0
+        self._urgent = False
+        self._sending = False
+        self._flush_task = None
+
+        #counters
+        self.edits_requested = 0
+        self.edits_sent = 0
+        self.edits_skipped = 0
+        self.rate_limited = 0
+
+    def edit(self, interaction, **kwargs):
+        """Queue an edit of the message, it is sent on the next free slot of the interval
+
+        Keyword arguments:
+
+        interaction = interaction used to edit the message
+
+        embed, view = new state of the message (embed can be an EmbedModel, rendered when sent)
+        """
+        self.edits_requested += 1
+        self._pending.update(kwargs)
+
+        #a new interaction must be answered right away or Discord marks it as failed
+        if interaction is not self.target:
+            self.target = interaction
+            self._urgent = True
+            self._cancel_flush()
+
+        if self._flush_task == None:
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def flush(self):
+        """Send the pending edit now (used before replies so the message is up to date)
+        """
+        self._cancel_flush()
+        await self._send()
+
+    def close(self):
+        """Drop pending edits and stop the scheduled flush
+        """
+        self._cancel_flush()
+        self._pending.clear()
+        self.target = None
+
+    def _cancel_flush(self):
+        #an edit already on its way to Discord is never interrupted
+        if self._flush_task != None and not self._sending and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    def _delay(self):
+        if self._urgent:
+            return 0
+        if self._last_sent == None:
+            return self._backoff
+        elapsed = asyncio.get_running_loop().time() - self._last_sent
+        return max(0, self.interval + self._backoff - elapsed)
+
+    async def _run(self):
+        try:
+            while self._pending:
+                delay = self._delay()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._urgent = False
+                await self._send()
+        finally:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+
+    async def _send(self):
+        if not self._pending or self.target == None:
+            return
+
+        #keep only the parts of the payload that changed since the last edit
+        changes = {}
+        snapshots = {}
+        for key, value in self._pending.items():
+            #view models render now and tell whether anything changed
+            if hasattr(value, 'render'):
+                rendered, changed = value.render()
+                if changed or self._last_payload.get(key) is not value:
+                    changes[key] = rendered
+                    snapshots[key] = value
+                continue
+            snapshot = payload_snapshot(value)
+            if key not in self._last_payload or self._last_payload[key] != snapshot:
+                changes[key] = value
+                snapshots[key] = snapshot
+        self._pending = {}
+        if not changes:
+            self.edits_skipped += 1
+            #the message is up to date, but a new interaction still needs an answer
+            #or Discord shows "This interaction failed"
+            response = getattr(self.target, 'response', None)
+            if response != None and not response.is_done():
+                await response.defer()
+            return
+
+        loop = asyncio.get_running_loop()
+        self._last_sent = loop.time()
+        self._sending = True
+        try:
+            await self.target.edit(**changes)
+        finally:
+            self._sending = False
+
+        self.edits_sent += 1
+        self._last_payload.update(snapshots)
+        elapsed = loop.time() - self._last_sent
+        if elapsed >= self.slow_edit:
+            #rate limited: py-cord waited for the bucket, keep the next edits as far apart
+            self.rate_limited += 1
+            self._backoff = min(self.max_backoff, elapsed)
+        else:
+            self._backoff = 0
+
+def payload_snapshot(value):
+    """Return a comparable copy of an edit argument (embed, view or plain value)
+    """
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'to_components'):
+        return value.to_components()
+    return value
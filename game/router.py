@@ -0,0 +1,83 @@
+import asyncio
+
+# - - - - | MessageRouter Class | - - - -
+class MessageRouter:
+    """Single on_message pipeline with a dispatch table keyed by (channel_id, command).
+
+    Messages that don't start with the prefix are rejected with one string check, the
+    rest cost at most two dict lookups: the channel's own route and the "any channel"
+    route (channel_id None).
+    """
+    def __init__(self, prefix = "!"):
+        self.prefix = prefix
+        self._routes = {}
+        #(command, handler) of the routes only accepting the command alone
+        self._exact = set()
+
+        #counters
+        self.received = 0
+        self.dispatched = 0
+
+    def add_route(self, command, handler, channel_ids = None, exact = False):
+        """Register a handler for a command
+
+        Keyword arguments:
+
+        command = full command including the prefix ("!bot")
+
+        handler = coroutine function called with the message
+
+        channel_ids = channels where the command is accepted (None for every channel)
+
+        exact = True to only accept a message that is the command alone ("!bot", not "!bot go")
+        """
+        for channel_id in channel_ids if channel_ids != None else (None,):
+            self._routes.setdefault((channel_id, command), []).append(handler)
+        if exact:
+            self._exact.add((command, handler))
+
+    def remove_route(self, command, handler):
+        """Unregister a handler from every channel
+        """
+        for key in [key for key in self._routes if key[1] == command]:
+            handlers = self._routes[key]
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                del self._routes[key]
+        self._exact.discard((command, handler))
+
+    def commands(self):
+        return {command for _, command in self._routes}
+
+    async def dispatch(self, msg):
+        """Run the handlers routed for the message
+
+        Returns:
+
+        True when at least one handler ran
+        """
+        self.received += 1
+        content = msg.content
+        if not content.startswith(self.prefix):
+            return False
+
+        #the command is the first word of the message (any whitespace ends it)
+        command = content.split(None, 1)[0]
+        handlers = self._routes.get((msg.channel.id, command))
+        everywhere = self._routes.get((None, command))
+        if handlers == None and everywhere == None:
+            return False
+
+        handlers = (handlers or []) + (everywhere or [])
+        if command != content and self._exact:
+            handlers = [handler for handler in handlers if (command, handler) not in self._exact]
+            if not handlers:
+                return False
+        self.dispatched += 1
+        if len(handlers) == 1:
+            await handlers[0](msg)
+        else:
+            #handlers run side by side, like separate listeners did
+            await asyncio.gather(*(handler(msg) for handler in handlers))
+        return True
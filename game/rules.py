@@ -0,0 +1,97 @@
+"""Game rules as pure functions.
+
+Every function only does arithmetic and comparisons on its arguments so the same
+rules work on plain ints (the bot) and on NumPy arrays (game.simulator). The constants
+below are the defaults; the bot passes the values of the game's guild (game.settings).
+"""
+
+PLAYER_MAX_HEALTH = 250
+PLAYER_DAMAGE_PER_LEVEL = 5
+MONSTER_DAMAGE_PER_LEVEL = 2
+MONSTER_HEALTH_PER_LEVEL = 20
+KILL_EXPERIENCE = 10
+KILL_SILVER_PER_LEVEL = 5
+LEVEL_EXPERIENCE = 100
+MAX_LEVEL = 4
+
+# Work: one counter of "work_counter_timeout" seconds costs and heals this much per second
+WORK_PRICE_PER_SECOND = 5
+WORK_MIN_SILVER = 25
+
+# Hunt timings (seconds)
+HUNT_SEARCH_TIME = 3 * 0.7
+HUNT_HIT_TIME = 1
+
+
+def player_damage(player_level, damage_per_level = PLAYER_DAMAGE_PER_LEVEL):
+    """Damage of a player hit"""
+    return damage_per_level * player_level
+
+def monster_damage(monster_level, damage_per_level = MONSTER_DAMAGE_PER_LEVEL):
+    """Damage of a monster hit"""
+    return damage_per_level * monster_level
+
+def monster_max_health(monster_level, health_per_level = MONSTER_HEALTH_PER_LEVEL):
+    return health_per_level * monster_level
+
+def kill_experience(monster_level, experience = KILL_EXPERIENCE):
+    return experience
+
+def kill_silver(monster_level, silver_per_level = KILL_SILVER_PER_LEVEL):
+    return silver_per_level * monster_level
+
+def level_up(level, experience, level_experience = LEVEL_EXPERIENCE):
+    """Apply at most one level up
+
+    Returns:
+
+    (level, experience) after the level up
+    """
+    up = experience >= level_experience
+    return level + up, experience - up * level_experience
+
+def has_won(level, max_level = MAX_LEVEL):
+    return level >= max_level
+
+def work_price(work_counter_timeout, price_per_second = WORK_PRICE_PER_SECOND):
+    """Silver cost (and health recovered) of one work counter"""
+    return work_counter_timeout * price_per_second
+
+def can_work(silver, price):
+    return silver - price >= 0
+
+def work_heal(health, max_health, price):
+    """Health after one work counter (never above max_health)"""
+    total = health + price
+    return total - (total > max_health) * (total - max_health)
+
+def split_reward(total, weights):
+    """Split an integer reward in proportion to the weights (party hunts: damage dealt),
+    the units left by the rounding go to the largest remainders
+
+    Returns:
+
+    List of shares adding up to total
+    """
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+    shares = [total * weight // weight_sum for weight in weights]
+    remainders = sorted(range(len(weights)), key = lambda index: -(total * weights[index] % weight_sum))
+    for index in remainders[:total - sum(shares)]:
+        shares[index] += 1
+    return shares
+
+def work_steps(health, max_health, silver, price):
+    """Number of work counters a work session runs before it stops by itself:
+    until the health reaches max_health or the silver can't pay one more counter
+    """
+    to_max_health = -((health - max_health) // price)
+    affordable = silver // price
+    return affordable - (affordable > to_max_health) * (affordable - to_max_health)
+
+def work_result(health, max_health, silver, price, steps):
+    """(health, silver) after "steps" work counters, same as "steps" calls of work_heal"""
+    total = health + steps * price
+    return total - (total > max_health) * (total - max_health), silver - steps * price
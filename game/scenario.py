@@ -0,0 +1,67 @@
+import json
+import os
+import time
+
+# - - - - | ScenarioRecorder Class | - - - -
+class ScenarioRecorder:
+    """Records the game interactions as a replayable scenario (one JSON object per line).
+
+    Each line is {"t": seconds since the recording started, "user": id, "guild": id, "action": name},
+    plus "leader" when a player presses another player's party button. This is
+    the format read by load_scenario() and replayed by benchmarks.harness.
+
+    The times start at 0 in every run, so each run records to a file of its own: the
+    path given when it doesn't exist yet, else the path with the start time added
+    ("scenario-20240131-142500.jsonl").
+    """
+    def __init__(self, path, clock = time.monotonic):
+        self.clock = clock
+        self._start = clock()
+        self.path, self._file = open_new(path)
+
+    def record(self, user_id, guild_id, action, **extra):
+        event = {"t": round(self.clock() - self._start, 3), "user": user_id, "guild": guild_id, "action": action}
+        event.update(extra)
+        self._file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def open_new(path):
+    """Create a file that doesn't exist yet at path, or next to it with the time (and a number) added
+
+    Returns:
+
+    (path created, file opened for writing, line buffered)
+    """
+    stem, extension = os.path.splitext(path)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    candidates = [path, f"{stem}-{stamp}{extension}"]
+    number = 1
+    while True:
+        candidate = candidates.pop(0) if candidates else f"{stem}-{stamp}-{number}{extension}"
+        try:
+            return candidate, open(candidate, 'x', buffering = 1)
+        except FileExistsError:
+            if not candidates:
+                number += 1
+
+
+def load_scenario(path):
+    """Read a recorded scenario
+
+    Returns:
+
+    List of events sorted by time
+    """
+    with open(path) as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    events.sort(key = lambda event: event["t"])
+    return events
+
+
+def save_scenario(path, events):
+    with open(path, 'w') as file:
+        for event in events:
+            file.write(json.dumps(event) + "\n")
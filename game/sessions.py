@@ -0,0 +1,151 @@
+import time
+import weakref
+from collections import OrderedDict
+
+# - - - - | SessionRegistry Class | - - - -
+class SessionRegistry:
+    """Active game sessions keyed by user.
+
+    One session per player (a new game replaces the old one), a global and a per
+    guild cap, and idle sessions closed after "idle_timeout" seconds without an
+    interaction. A session whose busy() is true (a hunt or work still running) is
+    never idle. Closing calls session.close(), which stops its tick sessions and
+    releases its state.
+    """
+    def __init__(self, max_sessions = 10000, max_per_guild = 1000, idle_timeout = 600, leak_grace = 60, clock = time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_per_guild = max_per_guild
+        self.idle_timeout = idle_timeout
+        #seconds a closed session may stay referenced (pending replies, message deletion) before it counts as leaked
+        self.leak_grace = leak_grace
+        self.clock = clock
+
+        #user_id -> (session, guild_id, last interaction), least recently used first
+        self._sessions = OrderedDict()
+        self._per_guild = {}
+        #closed sessions checked for leaks on the next sweep: (weakref, closed at)
+        self._closed = []
+
+        #counters
+        self.opened = 0
+        self.replaced = 0
+        self.evicted = 0
+        self.rejected = 0
+        self.leaked = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def sessions(self):
+        """Every open session, least recently used first"""
+        return [entry[0] for entry in self._sessions.values()]
+
+    def get(self, user_id):
+        entry = self._sessions.get(user_id)
+        return entry[0] if entry != None else None
+
+    def admit(self, user_id, guild_id):
+        """Check the caps before a new session is created (idle sessions are evicted to make room)
+
+        Returns:
+
+        False when the player can't start a game now
+        """
+        if user_id in self._sessions:
+            return True
+        if len(self._sessions) >= self.max_sessions or self._per_guild.get(guild_id, 0) >= self.max_per_guild:
+            self.sweep()
+        if len(self._sessions) >= self.max_sessions or self._per_guild.get(guild_id, 0) >= self.max_per_guild:
+            self.rejected += 1
+            return False
+        return True
+
+    def open(self, user_id, guild_id, session):
+        """Register the player's session, closing the one they already had
+        """
+        if user_id in self._sessions:
+            self.replaced += 1
+            self.close(user_id)
+        self._sessions[user_id] = (session, guild_id, self.clock())
+        self._per_guild[guild_id] = self._per_guild.get(guild_id, 0) + 1
+        self.opened += 1
+
+    def touch(self, user_id):
+        """Mark the player's session as used now
+        """
+        entry = self._sessions.get(user_id)
+        if entry != None:
+            self._sessions[user_id] = (entry[0], entry[1], self.clock())
+            self._sessions.move_to_end(user_id)
+
+    def close(self, user_id, session = None):
+        """Close the player's session (only if it is "session" when given)
+
+        Returns:
+
+        True when a session was closed
+        """
+        entry = self._sessions.get(user_id)
+        if entry == None or (session != None and entry[0] is not session):
+            return False
+        del self._sessions[user_id]
+        guild_id = entry[1]
+        self._per_guild[guild_id] -= 1
+        if not self._per_guild[guild_id]:
+            del self._per_guild[guild_id]
+
+        entry[0].close()
+        self._closed.append((weakref.ref(entry[0]), self.clock()))
+        return True
+
+    def sweep(self):
+        """Close the sessions idle for longer than idle_timeout and count the leaked ones
+
+        Returns:
+
+        Number of sessions evicted
+        """
+        now = self.clock()
+        evicted = 0
+        #sessions are kept in last interaction order, so only the idle ones are visited
+        while self._sessions:
+            user_id, (session, guild_id, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen < self.idle_timeout:
+                break
+            busy = getattr(session, 'busy', None)
+            if busy != None and busy():
+                #used by its tick sessions, nobody needs to press a button
+                self.touch(user_id)
+                continue
+            self.close(user_id)
+            evicted += 1
+        self.evicted += evicted
+
+        #a closed session still alive after the grace period is referenced from somewhere
+        still_closing = []
+        for reference, closed_at in self._closed:
+            if reference() == None:
+                continue
+            if now - closed_at < self.leak_grace:
+                still_closing.append((reference, closed_at))
+            else:
+                self.leaked += 1
+        self._closed = still_closing
+        return evicted
+
+    async def run(self, interval = 30):
+        """Tick engine session: sweeps every "interval" seconds
+        """
+        while True:
+            self.sweep()
+            yield interval
+
+    def metrics(self):
+        return {
+            "active": len(self._sessions),
+            "opened": self.opened,
+            "replaced": self.replaced,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+            "leaked": self.leaked,
+        }
@@ -0,0 +1,218 @@
+"""Game settings read from config.ini into an immutable snapshot, with per-guild overrides.
+
+The [DEFAULT] section holds the values of every guild and a [guild:<id>] section
+overrides some of them for one guild:
+
+    [DEFAULT]
+    channel_id = 111
+    hunt_hit_time = 1
+
+    [guild:123456789]
+    channel_id = 222,333
+    kill_silver_per_level = 10
+
+Each guild's settings are merged once when the file is loaded, so a lookup on the hot
+path is one dict get. GameConfig swaps in a new snapshot (one assignment) when the
+file changes; a file that doesn't parse leaves the current snapshot in place.
+"""
+import configparser
+import logging
+import os
+from types import MappingProxyType
+from typing import NamedTuple
+
+from game import rules
+
+log = logging.getLogger(__name__)
+
+GUILD_SECTION_PREFIX = "guild:"
+
+# Keys of config.ini whose name differs from the field
+CONFIG_KEYS = {"channel_ids": "channel_id"}
+
+# Lowest valid value of the numeric fields: a 0 s timer or a 0 price loops forever or divides by zero
+POSITIVE = ('work_counter_timeout', 'work_price_per_second', 'hunt_search_time', 'hunt_hit_time',
+            'player_damage_per_level', 'monster_damage_per_level', 'monster_health_per_level',
+            'kill_experience', 'level_experience', 'max_level')
+NOT_NEGATIVE = ('delete_message_timeout', 'work_min_silver', 'kill_silver_per_level')
+
+
+# - - - - | GameSettings Class | - - - -
+class GameSettings(NamedTuple):
+    """Settings of the games of one guild"""
+    #channels where "!bot" starts a game (empty for every channel)
+    channel_ids: frozenset
+    #seconds before the "!bot" message and the game's replies are deleted
+    delete_message_timeout: float
+    #seconds of one work counter (its price and health are work_price_per_second per second)
+    work_counter_timeout: int
+    work_price_per_second: int
+    work_min_silver: int
+    #seconds to find a monster and between two hits
+    hunt_search_time: float
+    hunt_hit_time: float
+    player_damage_per_level: int
+    monster_damage_per_level: int
+    monster_health_per_level: int
+    kill_experience: int
+    kill_silver_per_level: int
+    level_experience: int
+    max_level: int
+
+
+def default_settings():
+    """Settings used when config.ini sets nothing (the constants of game.rules)"""
+    return GameSettings(
+        channel_ids = frozenset(),
+        delete_message_timeout = 10.0,
+        work_counter_timeout = 5,
+        work_price_per_second = rules.WORK_PRICE_PER_SECOND,
+        work_min_silver = rules.WORK_MIN_SILVER,
+        hunt_search_time = rules.HUNT_SEARCH_TIME,
+        hunt_hit_time = rules.HUNT_HIT_TIME,
+        player_damage_per_level = rules.PLAYER_DAMAGE_PER_LEVEL,
+        monster_damage_per_level = rules.MONSTER_DAMAGE_PER_LEVEL,
+        monster_health_per_level = rules.MONSTER_HEALTH_PER_LEVEL,
+        kill_experience = rules.KILL_EXPERIENCE,
+        kill_silver_per_level = rules.KILL_SILVER_PER_LEVEL,
+        level_experience = rules.LEVEL_EXPERIENCE,
+        max_level = rules.MAX_LEVEL,
+    )
+
+
+def parse_value(kind, text):
+    if kind is frozenset:
+        return frozenset(int(item) for item in text.split(',') if item.strip())
+    if kind is int:
+        return int(text)
+    return float(text)
+
+
+def read_settings(section, defaults):
+    """Settings of a config section, the keys it doesn't set come from defaults
+
+    Raises:
+
+    ValueError naming the section and key of a value that doesn't parse or is out of range
+    """
+    values = {}
+    for field, kind in GameSettings.__annotations__.items():
+        key = CONFIG_KEYS.get(field, field)
+        if key in section:
+            try:
+                values[field] = parse_value(kind, section[key])
+            except ValueError:
+                raise ValueError(f"[{section.name}] {key} = {section[key]!r} is not a valid {kind.__name__}") from None
+            if field in POSITIVE and values[field] <= 0:
+                raise ValueError(f"[{section.name}] {key} = {section[key]!r} must be greater than 0")
+            if field in NOT_NEGATIVE and values[field] < 0:
+                raise ValueError(f"[{section.name}] {key} = {section[key]!r} must not be negative")
+    return defaults._replace(**values)
+
+
+# - - - - | ConfigSnapshot Class | - - - -
+class ConfigSnapshot:
+    """Settings of every guild at one point in time (never modified, replaced as a whole)"""
+    __slots__ = ('default', 'guilds', 'channel_ids', 'mtime')
+
+    def __init__(self, default, guilds = None, mtime = None):
+        self.default = default
+        #guild_id -> GameSettings with the overrides merged
+        self.guilds = MappingProxyType(dict(guilds or {}))
+        #every game channel of every guild (the "!bot" routes), None when a guild plays in
+        #every channel: the guilds without a section use the default
+        every = [default] + list(self.guilds.values())
+        if all(settings.channel_ids for settings in every):
+            self.channel_ids = frozenset().union(*(settings.channel_ids for settings in every))
+        else:
+            self.channel_ids = None
+        self.mtime = mtime
+
+    def for_guild(self, guild_id):
+        return self.guilds.get(guild_id, self.default)
+
+
+def load_snapshot(path):
+    """Read a config file
+
+    Returns:
+
+    ConfigSnapshot of the file (the defaults when it doesn't exist)
+    """
+    parser = configparser.ConfigParser()
+    mtime = os.stat(path).st_mtime if os.path.exists(path) else None
+    parser.read(path)
+    default = read_settings(parser[configparser.DEFAULTSECT], default_settings())
+    guilds = {}
+    for name in parser.sections():
+        if not name.startswith(GUILD_SECTION_PREFIX):
+            continue
+        try:
+            guild_id = int(name[len(GUILD_SECTION_PREFIX):])
+        except ValueError:
+            raise ValueError(f"[{name}] is not a guild section, expected [guild:<id>]") from None
+        #a section also sees the [DEFAULT] keys, they are already in default
+        guilds[guild_id] = read_settings(parser[name], default)
+    return ConfigSnapshot(default, guilds, mtime)
+
+
+# - - - - | GameConfig Class | - - - -
+class GameConfig:
+    """Current settings snapshot of a config file, replaced when the file changes"""
+    def __init__(self, path = None):
+        self.path = path
+        self.snapshot = load_snapshot(path) if path != None else ConfigSnapshot(default_settings())
+        #functions called with (old snapshot, new snapshot) after a swap
+        self._listeners = []
+        #mtime of a file that didn't parse (not read again until it changes)
+        self._failed_mtime = None
+
+        #counters
+        self.reloads = 0
+        self.failures = 0
+
+    def for_guild(self, guild_id):
+        """Settings of a guild (the defaults for a guild without a section or a DM)"""
+        return self.snapshot.for_guild(guild_id)
+
+    def on_change(self, callback):
+        self._listeners.append(callback)
+
+    def reload(self):
+        """Load the file again and swap the snapshot
+
+        Returns:
+
+        False when the file doesn't parse (the current snapshot stays)
+        """
+        if self.path == None:
+            self.snapshot = ConfigSnapshot(default_settings())
+            return True
+        try:
+            snapshot = load_snapshot(self.path)
+        except (configparser.Error, ValueError):
+            log.exception("Reading %s failed, the current settings stay", self.path)
+            self.failures += 1
+            self._failed_mtime = os.stat(self.path).st_mtime if os.path.exists(self.path) else None
+            return False
+        old, self.snapshot = self.snapshot, snapshot
+        self.reloads += 1
+        for callback in self._listeners:
+            callback(old, snapshot)
+        log.info("Reloaded %s (%d guild sections)", self.path, len(snapshot.guilds))
+        return True
+
+    def check(self):
+        """Reload when the file's mtime changed"""
+        if self.path == None or not os.path.exists(self.path):
+            return False
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self.snapshot.mtime or mtime == self._failed_mtime:
+            return False
+        return self.reload()
+
+    async def run(self, interval = 5.0):
+        """Check the file every "interval" seconds (tick engine session)"""
+        while True:
+            self.check()
+            yield interval
@@ -0,0 +1,157 @@
+"""Headless, batched simulation of the hunt/work economy.
+
+Every simulated player does one action per step (one battle hit or one work counter)
+and keeps its own game clock, so millions of actions run without Discord, sleeps or
+embeds. The rules come from game.rules, the same functions the bot uses.
+
+Run from the repository root:
+
+    python -m game.simulator --players 10000 --steps 3000
+"""
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from game import rules
+
+HUNTING = 0
+WORKING = 1
+
+
+def simulate(players = 10000, steps = 3000, work_counter_timeout = 5, work_below = 0.5, checkpoints = 10, seed = 0):
+    """Run the simulation and return its report
+
+    Keyword arguments:
+
+    players = number of simulated players
+
+    steps = actions done by each player
+
+    work_counter_timeout = same setting as MyView.work_counter_timeout
+
+    work_below = players go to work when their health falls below this fraction of max health
+
+    Returns:
+
+    dict with the time to reach each level, the death rate and the silver curve
+    """
+    if np == None:
+        raise ImportError("the simulator needs numpy (pip install numpy)")
+    rng = np.random.default_rng(seed)
+    price = rules.work_price(work_counter_timeout)
+    max_health = rules.PLAYER_MAX_HEALTH
+
+    level = np.ones(players, dtype = np.int64)
+    experience = np.zeros(players, dtype = np.int64)
+    silver = np.zeros(players, dtype = np.int64)
+    health = np.full(players, max_health, dtype = np.int64)
+    #each player keeps the monster of its level (a session spawns one per level)
+    monster_health = np.full(players, rules.monster_max_health(1), dtype = np.int64)
+    fighting = np.zeros(players, dtype = bool)
+    mode = np.full(players, HUNTING, dtype = np.int8)
+    active = np.ones(players, dtype = bool)
+    #players start at slightly different moments
+    clock = rng.uniform(0, rules.HUNT_SEARCH_TIME, players)
+
+    deaths = np.zeros(players, dtype = np.int64)
+    kills = np.zeros(players, dtype = np.int64)
+    reached = np.full((rules.MAX_LEVEL + 1, players), np.nan)
+    reached[1] = 0
+    curve = []
+    actions = 0
+
+    for step in range(steps):
+        if not active.any():
+            break
+        actions += int(active.sum())
+        hunting = active & (mode == HUNTING)
+        working = active & (mode == WORKING)
+
+        # - hunt: find a monster (search time) then hit it once per HUNT_HIT_TIME
+        searching = hunting & ~fighting
+        clock += np.where(searching, rules.HUNT_SEARCH_TIME, 0) + np.where(hunting, rules.HUNT_HIT_TIME, 0)
+        fighting |= searching
+        monster_health -= np.where(hunting, rules.player_damage(level), 0)
+
+        killed = hunting & (monster_health <= 0)
+        kills += killed
+        experience += np.where(killed, rules.kill_experience(level), 0)
+        silver += np.where(killed, rules.kill_silver(level), 0)
+        new_level, new_experience = rules.level_up(level, experience)
+        leveled = killed & (new_level != level)
+        level = np.where(killed, new_level, level)
+        experience = np.where(killed, new_experience, experience)
+        reached[level[leveled], np.flatnonzero(leveled)] = clock[leveled]
+        monster_health = np.where(killed, rules.monster_max_health(level), monster_health)
+        fighting &= ~killed
+
+        survived = hunting & ~killed
+        health -= np.where(survived, rules.monster_damage(level), 0)
+        died = survived & (health <= 0)
+        deaths += died
+        health = np.where(died, max_health, health)
+        fighting &= ~died
+        active &= ~rules.has_won(level)
+
+        # - work: one counter per work_counter_timeout seconds
+        paying = working & rules.can_work(silver, price)
+        clock += np.where(paying, work_counter_timeout, 0)
+        health = np.where(paying, rules.work_heal(health, max_health, price), health)
+        silver -= np.where(paying, price, 0)
+
+        # - strategy: work when hurt and between fights, hunt when healed or broke
+        to_work = hunting & ~fighting & (health < max_health * work_below) & (silver >= rules.WORK_MIN_SILVER)
+        to_hunt = working & ((health >= max_health) | ~rules.can_work(silver, price))
+        mode = np.where(to_work, WORKING, np.where(to_hunt, HUNTING, mode))
+
+        curve.append((float(clock.mean()), float(silver.mean()), float(level.mean())))
+
+    hours = clock / 3600
+    return {
+        "players": players,
+        "actions": actions,
+        "time_to_level": {
+            lvl: (float(np.nanmedian(reached[lvl])) if not np.isnan(reached[lvl]).all() else None, float((~np.isnan(reached[lvl])).mean()))
+            for lvl in range(2, rules.MAX_LEVEL + 1)
+        },
+        "deaths_per_hour": float((deaths / hours).mean()),
+        "death_rate_per_fight": float(deaths.sum() / max(1, deaths.sum() + kills.sum())),
+        "winners": float(rules.has_won(level).mean()),
+        "silver_curve": curve[::max(1, len(curve) // checkpoints)],
+    }
+
+
+def print_report(report, elapsed):
+    print(f"players:             {report['players']}")
+    print(f"actions simulated:   {report['actions']:,} in {elapsed:.2f}s ({report['actions'] / elapsed:,.0f}/s)")
+    for lvl, (median, share) in report["time_to_level"].items():
+        median_text = f"{median / 60:.1f} min" if median != None else "never"
+        print(f"time to level {lvl}:     {median_text} (median, reached by {share:.1%})")
+    print(f"deaths per hour:     {report['deaths_per_hour']:.2f}")
+    print(f"deaths per fight:    {report['death_rate_per_fight']:.2%}")
+    print(f"winners:             {report['winners']:.1%}")
+    print("silver curve (game minutes, mean silver, mean level):")
+    for clock, silver, level in report["silver_curve"]:
+        print(f"  {clock / 60:8.1f}  {silver:10.1f}  {level:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--players", type = int, default = 10000)
+    parser.add_argument("--steps", type = int, default = 3000)
+    parser.add_argument("--work-counter-timeout", type = int, default = 5)
+    parser.add_argument("--work-below", type = float, default = 0.5)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = simulate(args.players, args.steps, args.work_counter_timeout, args.work_below, seed = args.seed)
+    print_report(report, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
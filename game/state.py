@@ -0,0 +1,72 @@
+import weakref
+
+# - - - - | SessionState Class | - - - -
+class SessionState:
+    """Everything one game message needs, in a single slotted record.
+
+    MyView and its managers read and write the session through this object instead
+    of keeping their own copies of each other's attributes.
+    """
+    __slots__ = (
+        'player', 'renderer',
+        #guild of the game (its settings are looked up at every step)
+        'guild_id',
+        'delete_message_timeout',
+        #work counter
+        'work_counter_timeout', 'work_counter_price', 'work_amount_count', 'update_work_counter', 'work_counter_session',
+        #lazy work: start of the session, the rest is computed from the elapsed time
+        'work_started', 'work_start_health', 'work_start_silver', 'work_steps',
+        #hunting loop
+        'monsters', 'monster_found', 'monsters_defeated', 'hunting_loop_session',
+        #party hunt: players who joined this game's hunts
+        'party', 'party_damage', 'party_turn',
+        #screens
+        'embed_work', 'embed_hunt',
+    )
+
+    def __init__(self, player, renderer, work_counter_timeout, work_counter_price, delete_message_timeout):
+        self.player = player
+        self.renderer = renderer
+        self.guild_id = None
+        self.delete_message_timeout = delete_message_timeout
+
+        self.work_counter_timeout = work_counter_timeout
+        self.work_counter_price = work_counter_price
+        self.work_amount_count = 0
+        self.update_work_counter = 0
+        self.work_counter_session = None
+        self.work_started = None
+        self.work_start_health = 0
+        self.work_start_silver = 0
+        self.work_steps = 0
+
+        #monsters spawned for this session, indexed by level (filled on demand from the catalog)
+        self.monsters = {}
+        self.monster_found = None
+        self.monsters_defeated = 0
+        self.hunting_loop_session = None
+
+        #user_id -> (user, player, registry handle), in joining order
+        self.party = {}
+        #user_id -> damage dealt to the current monster (reward split)
+        self.party_damage = {}
+        self.party_turn = 0
+
+        self.embed_work = None
+        self.embed_hunt = None
+
+
+# - - - - | SessionManager Class | - - - -
+class SessionManager:
+    """Base of the managers of a view: they share its SessionState and only keep a weak
+    reference to the view, so a view is freed as soon as Discord drops it.
+    """
+    __slots__ = ('_view', 'state')
+
+    def __init__(self, view):
+        self._view = weakref.ref(view)
+        self.state = view.state
+
+    @property
+    def view(self):
+        return self._view()
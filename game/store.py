@@ -0,0 +1,438 @@
+import asyncio
+import secrets
+import sqlite3
+import time
+import threading
+from collections import OrderedDict
+
+#models is read at call time: a hot reload of game.models replaces its Player class
+from game import models
+
+# Player attributes saved in the database (in column order)
+PLAYER_COLUMNS = ('discord_id', 'name', 'level', 'experience', 'silver', 'max_health', 'health', 'monsters_defeated', 'guild_id')
+
+# Columns added after the first version of the table: (name, definition)
+ADDED_COLUMNS = (('monsters_defeated', 'INTEGER DEFAULT 0'), ('guild_id', 'INTEGER'), ('version', 'INTEGER DEFAULT 0'))
+
+# Columns merged as changes (database value + what this process changed) when another process wrote the player
+DELTA_COLUMNS = ('level', 'experience', 'silver', 'max_health', 'health', 'monsters_defeated')
+DELTA_INDEXES = tuple(PLAYER_COLUMNS.index(column) for column in DELTA_COLUMNS)
+HEALTH_INDEX = PLAYER_COLUMNS.index('health')
+MAX_HEALTH_INDEX = PLAYER_COLUMNS.index('max_health')
+
+
+def merge_row(current, base, row):
+    """Row of the database with the changes this process made since it last read or wrote the player
+
+    Keyword arguments:
+
+    current = row in the database now (written by another process)
+
+    base = row this process last read or wrote
+
+    row = row of this process's player
+
+    Returns:
+
+    Merged row (name and guild are this process's)
+    """
+    merged = list(row)
+    for index in DELTA_INDEXES:
+        merged[index] = (current[index] or 0) + (row[index] or 0) - (base[index] or 0)
+    merged[HEALTH_INDEX] = max(1, min(merged[HEALTH_INDEX], merged[MAX_HEALTH_INDEX]))
+    return tuple(merged)
+
+
+# - - - - | PlayerStore Class | - - - -
+class PlayerStore:
+    """Players saved in SQLite, loaded through an LRU cache and written behind in batches.
+
+    Game code changes the cached Player objects and calls mark_dirty(); the dirty players
+    are written in one transaction every "flush_interval" seconds and on close().
+
+    Several processes (shards) can share the database: every row has a version and a
+    write only succeeds on the version this process last saw. When another process wrote
+    the player in between, the changes this process made since are applied to the
+    database's row instead (silver, experience, health... are added, not overwritten) and
+    the cached player is updated to the merged values.
+    """
+    def __init__(self, path = 'players.db', cache_size = 10000, flush_interval = 5.0):
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+
+        self._db = sqlite3.connect(path, check_same_thread = False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS players ('
+            'discord_id INTEGER PRIMARY KEY, name TEXT, level INTEGER, experience INTEGER, '
+            'silver INTEGER, max_health INTEGER, health INTEGER)'
+        )
+        existing = {row[1] for row in self._db.execute('PRAGMA table_info(players)')}
+        for column, definition in ADDED_COLUMNS:
+            if column not in existing:
+                self._db.execute(f'ALTER TABLE players ADD COLUMN {column} {definition}')
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self._cache = OrderedDict()
+        self._dirty = {}
+        self._flush_task = None
+        #discord_id -> (version, row) last read or written by this process (written under the lock)
+        self._versions = {}
+        #players taken by a flush and not written yet
+        self._in_flight = set()
+
+        #counters
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.conflicts = 0
+
+    def load(self, discord_id, user_name = None):
+        """Return the player with this discord id, creating it on first use
+
+        Keyword arguments:
+
+        discord_id = id of the discord user
+
+        user_name = current name of the user (updates the saved one)
+        """
+        player = self._cache.get(discord_id)
+        if player != None:
+            self.hits += 1
+            self._cache.move_to_end(discord_id)
+        else:
+            self.misses += 1
+            #an evicted player can still be waiting for the next flush
+            player = self._dirty.get(discord_id)
+            if player == None:
+                player = self._read(discord_id, user_name)
+            self._cache[discord_id] = player
+            if len(self._cache) > self.cache_size:
+                evicted_id, _ = self._cache.popitem(last = False)
+                self._forget(evicted_id)
+
+        if user_name != None and player.name != user_name:
+            player.name = user_name
+            self.mark_dirty(player)
+        return player
+
+    def name(self, discord_id):
+        """Saved name of a player, without loading the player into the cache
+
+        Returns:
+
+        The name or None when the player is unknown
+        """
+        player = self._cache.get(discord_id) or self._dirty.get(discord_id)
+        if player != None:
+            return player.name
+        with self._lock:
+            row = self._db.execute('SELECT name FROM players WHERE discord_id = ?', (discord_id,)).fetchone()
+        return row[0] if row != None else None
+
+    def loaded(self):
+        """Players held in memory (cached or waiting for the next flush)"""
+        return list(self._cache.values()) + [player for discord_id, player in self._dirty.items() if discord_id not in self._cache]
+
+    def read_all(self):
+        """Every saved player row (safe to call from a thread)"""
+        with self._lock:
+            return self._db.execute(f'SELECT {", ".join(PLAYER_COLUMNS)} FROM players').fetchall()
+
+    def all_players(self, rows):
+        """Players of the rows from read_all(), the loaded ones (maybe not saved yet) in place of their row
+
+        Yields:
+
+        Player
+        """
+        for row in rows:
+            player = self._cache.get(row[0]) or self._dirty.get(row[0])
+            yield player if player != None else self._player(row)
+
+    def mark_dirty(self, player):
+        """Queue the player to be written on the next flush
+        """
+        self._dirty[player.discord_id] = player
+        if self._flush_task == None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._flush_task = loop.create_task(self._flush_later())
+
+    def flush(self):
+        """Write every dirty player in a single transaction
+
+        Returns:
+
+        Number of players written
+        """
+        rows = self._take_dirty()
+        return self._written(rows, self._write(rows))
+
+    async def flush_async(self):
+        """Same as flush() but the database work runs in a thread, off the event loop
+        """
+        rows = self._take_dirty()
+        return self._written(rows, await asyncio.to_thread(self._write, rows))
+
+    def close(self):
+        """Flush the pending changes and close the database
+        """
+        if self._flush_task != None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        self._db.close()
+
+    def _read(self, discord_id, user_name):
+        with self._lock:
+            row = self._db.execute(
+                f'SELECT {", ".join(PLAYER_COLUMNS)}, version FROM players WHERE discord_id = ?', (discord_id,)
+            ).fetchone()
+            if row != None:
+                self._versions[discord_id] = (row[-1] or 0, row[:-1])
+        if row == None:
+            player = models.Player(discord_id, user_name)
+            self._dirty[discord_id] = player
+            return player
+        return self._player(row[:-1])
+
+    def _player(self, row):
+        player = models.Player(row[0], row[1])
+        player.level, player.experience, player.silver, player.max_health, player.health, player.monsters_defeated, player.guild_id = row[2:]
+        player.monsters_defeated = player.monsters_defeated or 0
+        return player
+
+    def _forget(self, discord_id):
+        #the version is kept while the player is loaded or about to be written
+        if discord_id not in self._cache and discord_id not in self._dirty and discord_id not in self._in_flight:
+            self._versions.pop(discord_id, None)
+
+    def _take_dirty(self):
+        #rows are copied on the caller's thread so the game can keep changing the players
+        rows = [tuple(getattr(player, column) for column in PLAYER_COLUMNS) for player in self._dirty.values()]
+        self._in_flight.update(self._dirty)
+        self._dirty = {}
+        return rows
+
+    def _write(self, rows):
+        """Write the rows, merging the ones another process changed (runs on the writer thread)
+
+        Returns:
+
+        List of (row, merged row) of the players merged
+        """
+        if not rows:
+            return []
+        merges = []
+        columns = ", ".join(PLAYER_COLUMNS)
+        updates = ', '.join(f'{column} = ?' for column in PLAYER_COLUMNS[1:])
+        with self._lock, self._db:
+            #the write lock is taken first, so no other process writes between the version check and the writes
+            self._db.execute('BEGIN IMMEDIATE')
+            saved = {}
+            for start in range(0, len(rows), 500):
+                ids = [row[0] for row in rows[start:start + 500]]
+                saved.update(self._db.execute(
+                    f'SELECT discord_id, version FROM players WHERE discord_id IN ({", ".join("?" * len(ids))})', ids
+                ).fetchall())
+
+            inserts, updates_rows = [], []
+            for row in rows:
+                discord_id = row[0]
+                known = self._versions.get(discord_id)
+                if discord_id not in saved:
+                    inserts.append(row)
+                    self._versions[discord_id] = (1, row)
+                elif known != None and known[0] == (saved[discord_id] or 0):
+                    version = known[0] + 1
+                    updates_rows.append(row[1:] + (version, discord_id))
+                    self._versions[discord_id] = (version, row)
+                else:
+                    #another process wrote the player since this one read it (or created it first)
+                    base = known[1] if known != None else tuple(getattr(models.Player(discord_id, row[1]), column) for column in PLAYER_COLUMNS)
+                    current = self._db.execute(f'SELECT {columns}, version FROM players WHERE discord_id = ?', (discord_id,)).fetchone()
+                    merged = merge_row(current[:-1], base, row)
+                    version = (current[-1] or 0) + 1
+                    updates_rows.append(merged[1:] + (version, discord_id))
+                    self._versions[discord_id] = (version, merged)
+                    merges.append((row, merged))
+                    self.conflicts += 1
+            self._db.executemany(f'INSERT INTO players ({columns}, version) VALUES ({", ".join("?" * len(PLAYER_COLUMNS))}, 1)', inserts)
+            self._db.executemany(f'UPDATE players SET {updates}, version = ? WHERE discord_id = ?', updates_rows)
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return merges
+
+    def _written(self, rows, merges):
+        """Apply the merged rows to the loaded players, on the game's thread
+
+        Returns:
+
+        Number of players written
+        """
+        for row, merged in merges:
+            player = self._cache.get(row[0]) or self._dirty.get(row[0])
+            if player == None:
+                continue
+            #what the game changed since the rows were taken stays on top of the merge
+            for index in DELTA_INDEXES:
+                column = PLAYER_COLUMNS[index]
+                setattr(player, column, (getattr(player, column) or 0) + merged[index] - (row[index] or 0))
+            player.health = max(1, min(player.health, player.max_health))
+        for row in rows:
+            self._in_flight.discard(row[0])
+            self._forget(row[0])
+        return len(rows)
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._flush_task = None
+        await self.flush_async()
+
+
+# - - - - | SessionStore Class | - - - -
+class SessionStore:
+    """Compact records of the game messages using persistent buttons.
+
+    Only what the custom_id can't carry is saved (owner and guild), so a message costs
+    one small row and no memory while nobody clicks it. An ended game's row is deleted
+    and the rows older than "max_age" seconds (abandoned games, games lost in a crash)
+    are expired when the store opens and by run().
+
+    Like the player store, create() and end() only queue the change: the queued rows
+    are written in one transaction on a thread every "flush_interval" seconds, so the
+    event loop never waits on SQLite.
+    """
+    def __init__(self, path = 'players.db', max_age = 7 * 24 * 3600, flush_interval = 1.0):
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+
+        self._db = sqlite3.connect(path, check_same_thread = False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, owner_id INTEGER, guild_id INTEGER, created REAL, ended INTEGER DEFAULT 0)'
+        )
+        #games ended before their rows were deleted
+        self._db.execute('DELETE FROM sessions WHERE ended = 1')
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        #session_id -> (owner_id, guild_id, created) to insert, None to delete
+        self._pending = {}
+        #changes taken by a flush and not written yet
+        self._writing = {}
+        self._flush_task = None
+
+        #counters
+        self.expired = 0
+        self.expire()
+
+    def create(self, owner_id, guild_id):
+        """Save a new game
+
+        Returns:
+
+        The session id used in the custom_ids
+        """
+        session_id = secrets.token_urlsafe(6)
+        self._queue(session_id, (owner_id, guild_id, time.time()))
+        return session_id
+
+    def is_open(self, session_id, owner_id):
+        for changes in (self._pending, self._writing):
+            if session_id in changes:
+                row = changes[session_id]
+                return row != None and row[0] == owner_id
+        with self._lock:
+            row = self._db.execute(
+                'SELECT 1 FROM sessions WHERE session_id = ? AND owner_id = ? AND created >= ?',
+                (session_id, owner_id, time.time() - self.max_age),
+            ).fetchone()
+        return row != None
+
+    def end(self, session_id):
+        """Delete the game, its buttons won't rebuild it anymore
+        """
+        self._queue(session_id, None)
+
+    def expire(self):
+        """Delete the rows older than max_age (safe to call from a thread)
+
+        Returns:
+
+        Number of rows deleted
+        """
+        with self._lock, self._db:
+            deleted = self._db.execute('DELETE FROM sessions WHERE created < ?', (time.time() - self.max_age,)).rowcount
+        self.expired += deleted
+        return deleted
+
+    def flush(self):
+        """Write the queued changes in a single transaction
+        """
+        self._write(self._take_pending())
+        self._writing = {}
+
+    async def flush_async(self):
+        """Same as flush() but the database work runs in a thread, off the event loop
+        """
+        try:
+            await asyncio.to_thread(self._write, self._take_pending())
+        finally:
+            self._writing = {}
+
+    async def run(self, interval = 3600):
+        """Expire the old rows every "interval" seconds, on a thread (tick engine session)"""
+        while True:
+            await asyncio.to_thread(self.expire)
+            yield interval
+
+    def close(self):
+        if self._flush_task != None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        self._db.close()
+
+    def _queue(self, session_id, row):
+        self._pending[session_id] = row
+        if self._flush_task == None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._flush_task = loop.create_task(self._flush_later())
+
+    def _take_pending(self):
+        self._writing, self._pending = self._pending, {}
+        return self._writing
+
+    def _write(self, pending):
+        if not pending:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO sessions (session_id, owner_id, guild_id, created) VALUES (?, ?, ?, ?)',
+                [(session_id,) + row for session_id, row in pending.items() if row != None],
+            )
+            self._db.executemany(
+                'DELETE FROM sessions WHERE session_id = ?',
+                [(session_id,) for session_id, row in pending.items() if row == None],
+            )
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._flush_task = None
+        await self.flush_async()
@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+import logging
+
+log = logging.getLogger(__name__)
+
+# - - - - | TickEngine Class | - - - -
+class TickEngine:
+    """Drives every hunt and work session from a single task.
+
+    A session is an async generator that runs one step of the game and yields how
+    many seconds to wait before its next step. Sessions are kept in a heap keyed by
+    their next due time and every tick advances all the sessions that are due.
+    """
+    def __init__(self, resolution = 0.05, time_scale = 1.0):
+        #sessions due within the same resolution window are advanced in one batch
+        self.resolution = resolution
+        #real seconds per game second (< 1 compresses the clock for offline runs)
+        self.time_scale = time_scale
+
+        self._heap = []
+        self._sessions = set()
+        self._order = itertools.count()
+        self._task = None
+        self._wakeup = None
+        self._batches = set()
+
+        #counters
+        self.ticks = 0
+        self.steps = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def register(self, session, delay = 0):
+        """Add a session to the engine, its first step runs after "delay" seconds
+
+        Keyword arguments:
+
+        session = async generator yielding the delay before its next step
+
+        Returns:
+
+        The session (used as the handle to unregister it)
+        """
+        loop = asyncio.get_running_loop()
+        self._sessions.add(session)
+        self._push(loop.time() + delay * self.time_scale, session)
+        if self._task == None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        return session
+
+    def unregister(self, session):
+        """Remove a session from the engine, its next step never runs
+        """
+        if session != None:
+            #the heap entry is dropped lazily when it comes due
+            self._sessions.discard(session)
+
+    def clock(self):
+        """Current time in game seconds (the clock the session delays are counted in)"""
+        return asyncio.get_running_loop().time() / self.time_scale
+
+    def count_sessions(self, *names):
+        """Number of sessions created by the async generator functions with these names"""
+        return sum(1 for session in self._sessions if getattr(session, '__name__', None) in names)
+
+    def is_registered(self, session):
+        return session in self._sessions
+
+    def _push(self, due, session):
+        if not self._heap or due < self._heap[0][0]:
+            if self._wakeup != None:
+                self._wakeup.set()
+        heapq.heappush(self._heap, (due, next(self._order), session))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._sessions:
+            now = loop.time()
+            due = self._heap[0][0] if self._heap else now + 1
+            if due > now:
+                #sleep until the next session is due or an earlier one is registered
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            #collect every session due in this tick
+            batch = []
+            limit = now + self.resolution
+            while self._heap and self._heap[0][0] <= limit:
+                session = heapq.heappop(self._heap)[2]
+                if session in self._sessions:
+                    batch.append(session)
+            if not batch:
+                continue
+
+            self.ticks += 1
+            #the batch runs on its own so a slow step never delays the next tick
+            task = loop.create_task(self._advance(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+            await asyncio.sleep(0)
+
+    async def _advance(self, batch):
+        await asyncio.gather(*(self._step(session) for session in batch))
+
+    async def _step(self, session):
+        #unregistered after the batch was collected
+        if session not in self._sessions:
+            return
+        self.steps += 1
+        try:
+            delay = await session.__anext__()
+        except StopAsyncIteration:
+            self._sessions.discard(session)
+            return
+        except Exception:
+            log.exception("Tick session failed")
+            self._sessions.discard(session)
+            return
+
+        #the step may have unregistered its own session (stop_work, stop_hunting)
+        if session in self._sessions:
+            self._push(asyncio.get_running_loop().time() + delay * self.time_scale, session)
@@ -0,0 +1,62 @@
+import discord
+
+# - - - - | EmbedModel Class | - - - -
+class EmbedModel:
+    """View model of an embed.
+
+    Game code saves the values each field shows with set_field(); the discord.Embed is
+    built on first display and afterwards only the title and the fields whose values
+    changed are formatted again.
+    """
+    __slots__ = ('title', 'description', 'renders', '_formatters', '_values', '_rendered', '_embed')
+
+    def __init__(self, title, description, fields):
+        """Keyword arguments:
+
+        fields = list of (formatter, values), formatter(*values) returns the field (name, value)
+        """
+        self.title = title
+        self.description = description
+        self.renders = 0
+        self._formatters = tuple(formatter for formatter, _ in fields)
+        self._values = [values for _, values in fields]
+        self._rendered = [None] * len(fields)
+        self._embed = None
+
+    def set_field(self, index, *values):
+        """Save the values shown by a field (formatted on the next render)
+        """
+        self._values[index] = values
+
+    def render(self):
+        """Bring the embed up to date
+
+        Returns:
+
+        (embed, changed) where changed is False when nothing changed since the last render
+        """
+        self.renders += 1
+        if self._embed == None:
+            self._embed = discord.Embed(title = self.title, description = self.description)
+            for index, formatter in enumerate(self._formatters):
+                name, value = formatter(*self._values[index])
+                self._embed.add_field(name = name, value = value, inline = True)
+                self._rendered[index] = self._values[index]
+            return self._embed, True
+
+        changed = False
+        if self._embed.title != self.title:
+            self._embed.title = self.title
+            changed = True
+        for index, values in enumerate(self._values):
+            if values != self._rendered[index]:
+                name, value = self._formatters[index](*values)
+                self._embed.set_field_at(index, name = name, value = value, inline = True)
+                self._rendered[index] = values
+                changed = True
+        return self._embed, changed
+
+    @property
+    def embed(self):
+        """The up to date embed (built if needed)"""
+        return self.render()[0]
@@ -0,0 +1,945 @@
+import discord
+import asyncio
+import weakref
+from game import eventlog, rules
+from game.components import encode_custom_id, decode_custom_id
+from game.models import Monster, MONSTER_CATALOG
+from game.render import EditScheduler
+from game.settings import GameConfig
+from game.state import SessionState, SessionManager
+from game.viewmodel import EmbedModel
+
+# Shared services of the game, set by configure() (main.py or the offline harness)
+tick_engine = None
+player_store = None
+session_registry = None
+session_store = None
+leaderboard = None
+event_log = None
+recorder = None
+edit_interval = 1.0
+# Work sessions computed from the elapsed time instead of one step per counter
+lazy_work = False
+# Real seconds per game second for the waits outside the tick engine (< 1 compresses the clock)
+time_scale = 1.0
+# Settings of every guild (config.ini snapshot, the defaults until configure() sets one)
+game_config = GameConfig()
+
+# Services kept when the module is hot reloaded (game.extensions)
+__reload_keep__ = ('tick_engine', 'player_store', 'session_registry', 'session_store', 'leaderboard', 'event_log', 'recorder', 'edit_interval', 'lazy_work', 'time_scale', 'game_config')
+
+def configure(engine, store, registry, interval = 1.0, scale = 1.0, scenario_recorder = None, sessions = None, lazy = False, ranking = None, events = None, config = None):
+    """Set the services used by every game view
+
+    Keyword arguments:
+
+    engine = TickEngine advancing the hunt and work sessions
+
+    store = PlayerStore the players are loaded from
+
+    registry = SessionRegistry of the live games
+
+    interval = minimum seconds between two edits of a game message
+
+    scenario_recorder = ScenarioRecorder saving the interactions (None to disable)
+
+    sessions = SessionStore of the persistent games (None to keep one live view per message)
+
+    lazy = True to fast-forward the work sessions (the message is only edited when the work stops)
+
+    ranking = Leaderboard updated when the players change (None to disable)
+
+    events = EventLog recording the battle and work events (None to disable)
+
+    config = GameConfig of the guild settings (None for the defaults)
+    """
+    global tick_engine, player_store, session_registry, edit_interval, time_scale, recorder, session_store, lazy_work, leaderboard, event_log, game_config
+    tick_engine = engine
+    player_store = store
+    session_registry = registry
+    edit_interval = interval
+    time_scale = scale
+    recorder = scenario_recorder
+    session_store = sessions
+    lazy_work = lazy
+    leaderboard = ranking
+    event_log = events
+    game_config = config if config != None else GameConfig()
+
+# Objects of the game classes held by the services (moved to the new classes when a game module is reloaded)
+def live_objects():
+    if player_store != None:
+        yield from player_store.loaded()
+    if session_registry == None:
+        return
+    for session in session_registry.sessions():
+        yield session
+        #party members' sessions only point to the leader's view
+        state = getattr(session, 'state', None)
+        if state == None:
+            continue
+        yield from (session.embed_manager, session.button_manager, session.hunting_manager, session.work_manager)
+        yield state.player
+        yield from state.monsters.values()
+        for _, player, member in state.party.values():
+            yield player
+            yield member
+
+# Settings of the game's guild in the current snapshot (a new snapshot applies from the next step)
+def guild_settings(state):
+    return game_config.for_guild(state.guild_id)
+
+# Append an event to the battle log (when one is configured)
+def log_event(kind, player, monster_level = 0, amount = 0):
+    if event_log != None:
+        event_log.record(kind, player, monster_level, amount)
+
+# Name of a player: the server nickname, else the user's display name. Both come with the
+# message or interaction payload, so the name never needs the member cache or a fetch
+def display_name(user):
+    return getattr(user, 'nick', None) or user.display_name
+
+#- - - - | MyView Class | - - - -
+class MyView(discord.ui.View):
+    def __init__(self,msg,owner = None,session_id = None):
+        #no view timeout: idle games are closed by the session registry.
+        #persistent games (session_id) are not kept by discord, handle_component() routes their buttons
+        super().__init__(timeout=None, store=session_id == None)
+        #original message
+        self.msg = msg
+        #player of the game
+        self.owner = owner if owner != None else msg.author
+        self.session_id = session_id
+
+        # Saves references to the buttons
+        self.my_work_button = self.children[0]
+        self.my_hunting_button = self.children[1]
+        self.my_cancel_button = self.children[2]
+        self.my_party_button = self.children[3]
+        if session_id != None:
+            for action, button in BUTTON_ACTIONS.items():
+                self.children[button].custom_id = encode_custom_id(action, self.owner.id, session_id)
+
+        #Session state (player loaded from the store, created on the first game)
+        #the work counter is priced once per game, with the guild's settings
+        guild_id = msg.guild.id if msg.guild != None else None
+        settings = game_config.for_guild(guild_id)
+        self.state = SessionState(
+            player = player_store.load(self.owner.id,display_name(self.owner)),
+            #coalesces the edits of the game message
+            renderer = EditScheduler(edit_interval * time_scale),
+            work_counter_timeout = settings.work_counter_timeout,
+            work_counter_price = rules.work_price(settings.work_counter_timeout, settings.work_price_per_second),
+            #set the timeout to delete responded messsages
+            delete_message_timeout = settings.delete_message_timeout,
+        )
+        self.state.guild_id = guild_id
+        
+        #the player ranks in the guild where they play
+        if guild_id != None and self.state.player.guild_id != guild_id:
+            self.state.player.guild_id = guild_id
+            player_store.mark_dirty(self.state.player)
+            self.rank_player()
+
+        #create embeds (hunt and work screen)
+        self.embed_manager = EmbedManager(self)
+        self.embed_manager.create_embeds()
+
+        #Create instances for manager classes
+        self.button_manager = ButtonManager(self)
+        self.hunting_manager = HuntingManager(self)
+        self.work_manager = Workstation(self)
+
+        
+    #check if the user of the interaction is the same one who sent the message
+    def check_interaction(interaction,msg):
+        return int(interaction.user.id) != int(msg.author.id)
+
+    #mark the session as used (and record the action when a scenario is being recorded, "user" for another player's action)
+    def touch(self,action,user = None):
+        session_registry.touch(self.owner.id)
+        if recorder != None:
+            guild_id = self.msg.guild.id if self.msg.guild != None else None
+            if user == None:
+                recorder.record(self.owner.id, guild_id, action)
+            else:
+                recorder.record(user.id, guild_id, action, leader = self.owner.id)
+    
+    #a running hunt or work keeps the game in use between two button presses
+    def busy(self):
+        return tick_engine.is_registered(self.state.work_counter_session) or tick_engine.is_registered(self.state.hunting_loop_session)
+
+    #update the player's place in the leaderboard (after its level, silver or kills changed)
+    def rank_player(self):
+        if leaderboard != None:
+            leaderboard.update(self.state.player, self.state.player.guild_id)
+
+    #delete responded message on timeout 
+    async def delete_responded_message(self):
+        await asyncio.sleep(self.state.delete_message_timeout * time_scale)
+        await self.msg.delete()
+
+    #stop the tick sessions and release the monsters spawned for this session
+    def end_session(self):
+        self.work_manager.settle_work()
+        tick_engine.unregister(self.state.work_counter_session)
+        tick_engine.unregister(self.state.hunting_loop_session)
+        self.state.work_counter_session = None
+        self.state.hunting_loop_session = None
+        self.state.monster_found = None
+        self.state.monsters.clear()
+        self.hunting_manager.disband_party()
+        self.state.renderer.close()
+
+    #end the session and stop listening to the buttons
+    def close(self):
+        self.end_session()
+        self.stop()
+
+    #close the session through the registry (or directly if it was already replaced)
+    def finish(self):
+        if session_store != None and self.session_id != None:
+            session_store.end(self.session_id)
+        if not session_registry.close(self.owner.id, self):
+            self.close()
+
+    async def handle(self,action,interaction):
+        """Run the button "action" ("work", "hunt", "cancel" or "party") for the game owner
+           ("party" is pressed by the other players)
+        """
+        if self.is_finished():
+            #the game ended (cancel, win, eviction) while a click was on its way
+            await interaction.response.send_message("This game is over.", ephemeral = True)
+            return
+        if action == "party":
+            self.touch(action, interaction.user)
+            await self.hunting_manager.toggle_member(interaction.user, interaction)
+            return
+        self.touch(action)
+        if action == "work":
+            #check whether it is a start work or a stop work and direct the right way
+            if self.my_work_button.label == "Work":
+                await self.button_manager.start_work(interaction)
+            else:
+                await self.button_manager.stop_work(interaction)
+        elif action == "hunt":
+            #check whether it is a start hunting or a stop hunting and direct the right way
+            if self.my_hunting_button.label == "Start Hunting":
+                await self.button_manager.start_hunting(interaction)
+            else:
+                await self.button_manager.stop_hunting(interaction)
+        elif action == "cancel":
+            await self.button_manager.start_cancel(interaction)
+
+    @discord.ui.button(label='Work')
+    async def work_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+       if MyView.check_interaction(interaction, self.msg):
+           return
+       await self.handle("work", interaction)
+    
+    @discord.ui.button(label='Start Hunting', style=discord.ButtonStyle.blurple)
+    async def start_hunting_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+        if MyView.check_interaction(interaction, self.msg):
+           return
+        await self.handle("hunt", interaction)
+
+    @discord.ui.button(label='Cancel', style=discord.ButtonStyle.red)
+    async def cancel_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+        if MyView.check_interaction(interaction, self.msg):
+           return
+        await self.handle("cancel", interaction)
+
+    @discord.ui.button(label='Join/Leave Party', style=discord.ButtonStyle.green)
+    async def party_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+        #every player but the owner can join the owner's hunts
+        if interaction.user.id == self.owner.id:
+            return
+        await self.handle("party", interaction)
+
+# Index of each button action in MyView.children
+BUTTON_ACTIONS = {"work": 0, "hunt": 1, "cancel": 2, "party": 3}
+
+# - - - - | PartyMember Class | - - - -
+class PartyMember:
+    """Registry session of a player who joined another player's hunts: starting their own
+    game (or being evicted) closes it and takes them out of the party.
+    """
+    __slots__ = ('_view', 'user_id', '__weakref__')
+
+    def __init__(self, view, user_id):
+        self._view = weakref.ref(view)
+        self.user_id = user_id
+
+    def close(self):
+        view = self._view()
+        if view != None:
+            view.hunting_manager.leave_party(self.user_id)
+
+# - - - - | EmbedManager Class | - - - -
+class EmbedManager(SessionManager):
+    __slots__ = ()
+    
+    def create_embeds(self):
+        """ Creates the "Work Embed" Screen and the "Hunt Embed" Screen generated by the respective buttons.
+            The discord embeds are only built when the screen is displayed for the first time.
+
+        Returns:
+
+        Created Embed models (saved in the session state)
+        """
+        player = self.state.player
+
+        #"Work Embed"
+        self.state.embed_work = EmbedModel("Workstation", f"--- Work to buy Counter and recover your Health ---\n-> {self.state.work_counter_timeout} Counter costs {self.state.work_counter_price} silvers\n-> {self.state.work_counter_timeout} Counter recover {self.state.work_counter_price} health", [
+            (EmbedManager.counter_field, (self.state.update_work_counter,)),
+            (EmbedManager.silver_field, (player.silver, "")),
+            (EmbedManager.health_field, (player.health, player.max_health, "")),
+        ])
+
+        #"Hunt Embed"
+        self.state.embed_hunt = EmbedModel("Game Information", "Kill monsters to farm silver and experience", [
+            (EmbedManager.player_field, (player.name, player.level, player.experience, player.silver, player.health, player.max_health, self.state.monsters_defeated)),
+            (EmbedManager.monster_field, ("",)),
+            (EmbedManager.party_field, ((),)),
+        ])
+
+    def counter_field(counter):
+        return "Counter", f"{counter}"
+
+    def silver_field(silver, silver_amount):
+        return "Your Silver", f"{silver}{silver_amount}"
+
+    def health_field(health, max_health, health_amount):
+        return "Your Health", f"{health}/{max_health}{health_amount}"
+
+    def player_field(name, level, experience, silver, health, max_health, monsters_defeated):
+        return 'Player', f"Name: {name}\nLevel: {level}\nExperience: {experience}\nSilver: {silver}\nHealth: {health}/{max_health}\nMonsters Defeated: {monsters_defeated}"
+
+    def party_field(members):
+        if not members:
+            return "", ""
+        return "Party", "\n".join(f"{name} - Level {level} - Health: {health}/{max_health}" for name, level, health, max_health in members)
+
+    def monster_field(name, monster_name = None, level = None, health = None, max_health = None):
+        if name == None:
+            return "Monster found", f"Name: {monster_name}\nLevel: {level}\nHealth: {health}/{max_health}"
+        elif name == "":
+            return name, ""
+        else:
+            return name, "No monsters currently"
+
+
+# - - - - | ButtonManager Class | - - - -
+class ButtonManager(SessionManager):
+    __slots__ = ()
+
+    def button_disabled(self,status:bool,button_name1:str,button_name2:str = None,button_name3:str = None,button_name4:str = None):
+        """Update the View disabling/enabling buttons sent by "button_name".
+
+        Keyword arguments:
+
+        status = True to enable|False to disable
+
+        button_name1 =  "Work","Cancel","Hunt","Party"
+
+        Returns:
+
+        Buttons Disabled/Enabled
+        """
+        buttons = []
+        buttons.extend([button_name1,button_name2,button_name3,button_name4])  
+
+        #Check the button name and find the corresponding button
+        for button in buttons:
+            if button == "work":
+                self.view.my_work_button.disabled = status
+            elif button == "cancel":
+                self.view.my_cancel_button.disabled = status
+            elif button == "hunt":
+                self.view.my_hunting_button.disabled = status
+            elif button == "party":
+                self.view.my_party_button.disabled = status
+
+    async def start_work(self,interaction): 
+        """Sends the "Work Embed" to the screen and checks the player's 
+           conditions to continue or not with the action".
+        """
+        self.state.embed_work.title = "Workstation"
+        self.state.update_work_counter = 0
+        self.view.work_manager.update_work_info("","")
+        self.state.renderer.edit(interaction, embed = self.state.embed_work)
+        if self.state.player.health  < self.state.player.max_health:
+            if self.state.player.silver >= guild_settings(self.state).work_min_silver:
+                self.state.work_amount_count = 0 
+                self.view.my_work_button.label = "Stop Work"
+                self.button_disabled(True,"hunt","cancel") 
+                self.state.embed_work.title = "Workstation (Working.)"
+                self.state.renderer.edit(interaction, embed = self.state.embed_work, view = self.view)
+
+                if lazy_work:
+                    #only the start is saved, the session wakes up once when the work ends by itself
+                    self.state.work_started = tick_engine.clock()
+                    self.state.work_start_health = self.state.player.health
+                    self.state.work_start_silver = self.state.player.silver
+                    self.state.work_steps = rules.work_steps(self.state.player.health, self.state.player.max_health, self.state.player.silver, self.state.work_counter_price)
+                    self.state.work_counter_session = tick_engine.register(self.view.work_manager.work_fast_forward(interaction))
+                else:
+                    #registers the work_counter session in the tick engine
+                    self.state.work_counter_session = tick_engine.register(self.view.work_manager.work_counter(interaction))
+
+            else:
+                self.state.embed_work.title = "Workstation (Not enough silver to do it)"
+                self.state.renderer.edit(interaction, embed = self.state.embed_work)
+        else:
+           self.state.embed_work.title = "Workstation (You are already at maximum health)"
+           self.state.renderer.edit(interaction, embed = self.state.embed_work)
+
+    async def start_hunting(self,interaction):
+        """Sends the "Hunt Embed" to the screen and starts hunting.
+        """
+        self.view.my_hunting_button.label = "Stop Hunting"  
+        self.button_disabled(True,"work","cancel")  
+        self.state.renderer.edit(interaction, view = self.view, embed = self.state.embed_hunt)
+
+        #registers the hunting loop session in the tick engine
+        self.state.hunting_loop_session = tick_engine.register(self.view.hunting_manager.hunting_loop(interaction))
+
+    async def start_cancel(self, interaction):
+        """Makes the bot unusable by disabling the button and sending a farewell message.
+        """
+        self.button_disabled(True,"work","cancel","hunt","party") 
+        tick_engine.unregister(self.state.work_counter_session)
+        tick_engine.unregister(self.state.hunting_loop_session)
+        self.state.renderer.edit(interaction, embed = self.state.embed_hunt ,view = self.view)
+        await self.state.renderer.flush()
+        await interaction.message.reply('Goodbye!')
+        self.view.finish()
+    
+    async def stop_work(self,interaction):
+        """Stops the work counter session, resets screen and buttons to initial setting and update Embeds informations.
+        """
+        tick_engine.unregister(self.state.work_counter_session)
+        self.state.work_counter_session = None
+        self.view.work_manager.settle_work()
+        self.view.my_work_button.label = "Work"
+        self.button_disabled(False,"cancel","hunt")
+        self.view.hunting_manager.update_player_info()
+        self.view.work_manager.update_work_info(f"(-{self.state.work_amount_count})",f"(+{self.state.work_amount_count})")
+        self.state.renderer.edit(interaction, embed = self.state.embed_work, view = self.view)
+
+    async def stop_hunting(self,interaction):
+        """Stops the hunting loop session, resets screen and buttons to initial setting and update Embeds informations.
+        """
+        tick_engine.unregister(self.state.hunting_loop_session)
+        self.state.hunting_loop_session = None
+        self.view.my_hunting_button.label = "Start Hunting"
+        self.button_disabled(False,"work","cancel") 
+        self.view.hunting_manager.update_monster_info("")
+        self.view.work_manager.update_work_info("","")
+
+        #check monster existence and reset its max_health
+        self.state.party_damage.clear()
+        if self.state.monster_found != None:
+            self.state.monster_found.health = self.state.monster_found.max_health
+            self.state.monster_found = None
+
+        self.state.renderer.edit(interaction, embed = self.state.embed_hunt, view = self.view)
+
+class Workstation(SessionManager):
+    __slots__ = ()
+        
+    async def work_counter(self,interaction):
+        """
+            Check the player's silver and health to continue or not recovering health spent on silver
+
+            Runs as a tick engine session: yields the seconds to wait before the next step
+        """
+        while True:
+            #the player doesn't press buttons while working, the work keeps the session alive
+            session_registry.touch(self.view.owner.id)
+            #check if (player silver - counter price) >= 0
+            if rules.can_work(self.state.player.silver, self.state.work_counter_price):
+
+                #check if (player health + counter price) <= player max health
+                if (self.state.player.health + self.state.work_counter_price) < self.state.player.max_health:
+                    async for delay in self.work_timer(interaction):
+                        yield delay
+
+                    #updates variables with the new values
+                    self.state.player.health = rules.work_heal(self.state.player.health, self.state.player.max_health, self.state.work_counter_price)
+                    self.state.player.silver -= self.state.work_counter_price
+                    self.state.update_work_counter += self.state.work_counter_timeout
+                    self.state.work_amount_count += self.state.work_counter_price
+                    log_event(eventlog.WORK, self.state.player, amount = self.state.work_counter_price)
+                    player_store.mark_dirty(self.state.player)
+                    self.view.rank_player()
+
+                    self.update_work_info(f"(-{self.state.work_amount_count})",f"(+{self.state.work_amount_count})")
+                    self.state.renderer.edit(interaction, embed = self.state.embed_work)
+                    
+                else: 
+                    async for delay in self.work_timer(interaction):
+                        yield delay
+                    
+                    #updates variables with the new values
+                    self.state.player.silver -= self.state.work_counter_price
+                    self.state.update_work_counter += self.state.work_counter_timeout
+                    self.state.work_amount_count += self.state.work_counter_price
+                    self.state.player.health = rules.work_heal(self.state.player.health, self.state.player.max_health, self.state.work_counter_price)
+                    log_event(eventlog.WORK, self.state.player, amount = self.state.work_counter_price)
+                    player_store.mark_dirty(self.state.player)
+                    self.view.rank_player()
+
+                    self.state.embed_work.title = "Workstation (You have reached maximum health)"
+                    self.update_work_info(f"(-{self.state.work_amount_count})",f"(+{self.state.work_amount_count})")
+                    self.state.renderer.edit(interaction, embed = self.state.embed_work)
+                    await self.view.button_manager.stop_work(interaction)
+                    return
+            else:
+                self.state.embed_work.title = "Workstation (Not enough silver to continue)"
+                self.state.renderer.edit(interaction, embed = self.state.embed_work)
+                await self.view.button_manager.stop_work(interaction)
+                return
+
+
+    async def work_fast_forward(self,interaction):
+        """
+            Lazy work mode: waits for the end of the work in one step, the counters done
+            in between are computed by settle_work()
+
+            Runs as a tick engine session: yields the seconds to wait before the next step
+        """
+        yield self.state.work_steps * self.state.work_counter_timeout
+
+        self.settle_work(self.state.work_steps)
+        if self.state.player.health >= self.state.player.max_health:
+            self.state.embed_work.title = "Workstation (You have reached maximum health)"
+        else:
+            self.state.embed_work.title = "Workstation (Not enough silver to continue)"
+        self.state.renderer.edit(interaction, embed = self.state.embed_work)
+        await self.view.button_manager.stop_work(interaction)
+
+    def settle_work(self,steps = None):
+        """ Apply the work counters done since the lazy work started (same values as work_counter)
+
+        Keyword arguments:
+
+        steps = counters done (None to count them from the elapsed time)
+
+        Returns:
+
+        Player health and silver updated, the lazy work ended
+        """
+        if self.state.work_started == None:
+            return
+        if steps == None:
+            elapsed = tick_engine.clock() - self.state.work_started
+            steps = min(int(elapsed // self.state.work_counter_timeout), self.state.work_steps)
+
+            #title work_timer would be showing at this time
+            messages = ["Workstation (Working.)","Workstation (Working..)","Workstation (Working...)"]
+            phase = int(elapsed % self.state.work_counter_timeout // (self.state.work_counter_timeout / 3))
+            self.state.embed_work.title = messages[min(phase, 2)]
+        self.state.work_started = None
+
+        self.state.player.health, self.state.player.silver = rules.work_result(self.state.work_start_health, self.state.player.max_health, self.state.work_start_silver, self.state.work_counter_price, steps)
+        self.state.update_work_counter = steps * self.state.work_counter_timeout
+        self.state.work_amount_count = steps * self.state.work_counter_price
+        if steps:
+            log_event(eventlog.WORK, self.state.player, amount = steps * self.state.work_counter_price)
+            player_store.mark_dirty(self.state.player)
+            self.view.rank_player()
+    
+    def update_work_info(self,silver_amount,health_amount):
+        """ Update the "Work Embed" with the new values
+
+        Keyword arguments:
+
+        silver_amount = amount of silver used in work count
+
+        health_amount = amount of health used in job count
+
+        Returns:
+
+        "Work Embed" values saved (formatted when the embed is rendered)
+        """
+        self.state.embed_work.set_field(0, self.state.update_work_counter)
+        self.state.embed_work.set_field(1, self.state.player.silver, silver_amount)
+        self.state.embed_work.set_field(2, self.state.player.health, self.state.player.max_health, health_amount)
+
+        
+
+    async def work_timer(self, interaction):
+        """ Simulates a waiting time with messages interspersed between the time determined by the Work Timeout
+
+        Yields:
+
+        The wait between "Working." "Working.." "Working..."
+        """
+
+
+        messages = []
+        messages.extend(["Workstation (Working.)","Workstation (Working..)","Workstation (Working...)"])
+
+        for message in messages:
+            self.state.embed_work.title = message
+            self.state.renderer.edit(interaction, embed = self.state.embed_work)
+            yield self.state.work_counter_timeout / 3
+
+class HuntingManager(SessionManager):
+    __slots__ = ()
+
+    async def hunt_timer(self, interaction):
+        """ Simulates a waiting time with messages interspersed between 2 seconds
+        
+        Yields:
+
+        The wait between "Hunting." "Hunting.." "Hunting..."
+        """
+        messages = []
+        messages.extend(["Hunting.","Hunting..","Hunting..."])
+
+        for message in messages:
+            self.update_monster_info(message)
+            self.state.renderer.edit(interaction, embed = self.state.embed_hunt)
+            yield guild_settings(self.state).hunt_search_time / len(messages)
+
+
+
+
+    def find_monster(self,level):
+        """Return this session's monster for the given level, spawning it from the catalog on first use
+
+        Returns:
+
+        Monster instance or None when the catalog has no monster for that level
+        """
+        monster = self.state.monsters.get(level)
+        if monster == None:
+            template = MONSTER_CATALOG.get(level)
+            if template == None:
+                return None
+            settings = guild_settings(self.state)
+            monster = Monster(template, rules.monster_max_health(level, settings.monster_health_per_level))
+            self.state.monsters[level] = monster
+        return monster
+    
+    def update_player_info(self):
+        """ Update the "Hunt Embed" with informations stored in Player Class
+        """
+        player = self.state.player
+        self.state.embed_hunt.set_field(0, player.name, player.level, player.experience, player.silver, player.health, player.max_health, self.state.monsters_defeated)
+    
+    def update_monster_info(self,name = None):
+        """ Update the "Hunt Embed" with informations stored in Monster Class
+        """
+        if name == None:
+            monster = self.state.monster_found
+            self.state.embed_hunt.set_field(1, None, monster.name, monster.level, monster.health, monster.max_health)
+        else:
+            self.state.embed_hunt.set_field(1, name)
+
+
+    async def hunting_loop(self,interaction):
+        """
+            Look for a monster of the player's level and battle it until the hunt is over
+
+            Runs as a tick engine session: yields the seconds to wait before the next step
+        """
+        while True:
+            if self.state.monster_found == None:
+                async for delay in self.hunt_timer(interaction):
+                    yield delay
+                monster = self.find_monster(self.state.player.level)
+                if monster != None:
+                    self.state.monster_found = monster
+                    self.update_monster_info()                
+                    self.state.renderer.edit(interaction, embed = self.state.embed_hunt)
+                    yield guild_settings(self.state).hunt_hit_time
+                    #a party fights the monster together in one step
+                    battle = self.party_battle if self.state.party else self.battle
+                    if not await battle(interaction):
+                        return
+            else:
+                yield guild_settings(self.state).hunt_hit_time
+                battle = self.party_battle if self.state.party else self.battle
+                if not await battle(interaction):
+                    return
+                
+               
+    
+
+    async def battle(self,interaction):
+        """
+            Control the battle by checking Player and monster informations
+
+            Returns:
+
+            False when the hunt is over (player won or died)
+        """
+        hunting = True
+        settings = guild_settings(self.state)
+        #the player doesn't press buttons while hunting, the hunt keeps the session alive
+        session_registry.touch(self.view.owner.id)
+
+        #hit the monster
+        self.state.monster_found.health -= rules.player_damage(self.state.player.level, settings.player_damage_per_level)
+        log_event(eventlog.HIT, self.state.player, self.state.monster_found.level, rules.player_damage(self.state.player.level, settings.player_damage_per_level))
+
+        #if monster died
+        if self.state.monster_found.health <= 0:
+             self.state.player.experience += rules.kill_experience(self.state.monster_found.level, settings.kill_experience)
+             self.state.monster_found.health = self.state.monster_found.max_health
+             self.state.player.silver += rules.kill_silver(self.state.monster_found.level, settings.kill_silver_per_level)
+             self.state.monsters_defeated += 1
+             self.state.player.monsters_defeated += 1
+             log_event(eventlog.KILL, self.state.player, self.state.monster_found.level, rules.kill_silver(self.state.monster_found.level, settings.kill_silver_per_level))
+            
+            #if player experience is at maximum
+             if self.state.player.experience >= settings.level_experience:
+                 self.state.player.level, self.state.player.experience = rules.level_up(self.state.player.level, self.state.player.experience, settings.level_experience)
+                 log_event(eventlog.LEVEL_UP, self.state.player, self.state.monster_found.level)
+                
+                #if player level is at maximum
+                 if rules.has_won(self.state.player.level, settings.max_level):                  
+                    log_event(eventlog.WIN, self.state.player)
+                    self.view.button_manager.button_disabled(True,"work","cancel","hunt","party") 
+                    self.view.my_hunting_button.label = "Start Hunting"
+                    self.update_monster_info("")
+                    self.update_player_info()
+                    self.state.monster_found = None
+                    self.state.renderer.edit(interaction, embed = self.state.embed_hunt, view = self.view)
+                    await self.state.renderer.flush()
+                    await interaction.message.reply("You won!")
+                    self.view.finish()
+                    hunting = False
+                    
+             self.update_player_info()
+             self.state.monster_found = None        
+             
+        else:
+
+            #hit the player
+            self.state.player.health -= rules.monster_damage(self.state.monster_found.level, settings.monster_damage_per_level)
+            log_event(eventlog.HURT, self.state.player, self.state.monster_found.level, rules.monster_damage(self.state.monster_found.level, settings.monster_damage_per_level))
+
+            #if player died
+            if self.state.player.health <= 0:
+                self.state.player.health = self.state.player.max_health
+                log_event(eventlog.DEATH, self.state.player, self.state.monster_found.level, rules.monster_damage(self.state.monster_found.level, settings.monster_damage_per_level))
+                self.view.button_manager.button_disabled(False,"work","cancel","hunt") 
+                self.view.my_hunting_button.label = "Start Hunting"
+                self.update_monster_info("")
+                self.update_player_info()
+                self.state.monster_found = None
+                self.state.renderer.edit(interaction, embed = self.state.embed_hunt, view = self.view)
+                await self.state.renderer.flush()
+                await interaction.message.reply("You have died!")
+                hunting = False
+            else:
+                self.update_player_info()
+                self.update_monster_info()
+
+        player_store.mark_dirty(self.state.player)
+        self.view.rank_player()
+        self.state.renderer.edit(interaction, embed = self.state.embed_hunt)
+        return hunting
+
+    async def party_battle(self,interaction):
+        """
+            One hit of every party member (the owner first) on the shared monster, then the
+            monster hits one member in turn. Rewards are split by the damage each member dealt.
+
+            Returns:
+
+            False when the hunt is over (owner won or died)
+        """
+        hunting = True
+        settings = guild_settings(self.state)
+        monster = self.state.monster_found
+        members = [(self.view.owner, self.state.player)] + [(user, player) for user, player, _ in self.state.party.values()]
+        for user, player in members:
+            damage = rules.player_damage(player.level, settings.player_damage_per_level)
+            monster.health -= damage
+            self.state.party_damage[user.id] = self.state.party_damage.get(user.id, 0) + damage
+            log_event(eventlog.HIT, player, monster.level, damage)
+            #members don't press buttons while hunting, the hunt keeps their session alive
+            session_registry.touch(user.id)
+
+        winners = []
+        #if monster died
+        if monster.health <= 0:
+            damages = [self.state.party_damage.get(user.id, 0) for user, _ in members]
+            experiences = rules.split_reward(rules.kill_experience(monster.level, settings.kill_experience), damages)
+            silvers = rules.split_reward(rules.kill_silver(monster.level, settings.kill_silver_per_level), damages)
+            self.state.party_damage.clear()
+            monster.health = monster.max_health
+            self.state.monsters_defeated += 1
+
+            for (user, player), experience, silver in zip(members, experiences, silvers):
+                player.experience += experience
+                player.silver += silver
+                player.monsters_defeated += 1
+                log_event(eventlog.KILL, player, monster.level, silver)
+                if player.experience >= settings.level_experience:
+                    player.level, player.experience = rules.level_up(player.level, player.experience, settings.level_experience)
+                    log_event(eventlog.LEVEL_UP, player, monster.level)
+                    if rules.has_won(player.level, settings.max_level):
+                        log_event(eventlog.WIN, player)
+                        winners.append(user)
+            self.state.monster_found = None
+            self.update_monster_info("")
+        else:
+            #hit the member whose turn it is
+            user, player = members[self.state.party_turn % len(members)]
+            self.state.party_turn += 1
+            damage = rules.monster_damage(monster.level, settings.monster_damage_per_level)
+            player.health -= damage
+            log_event(eventlog.HURT, player, monster.level, damage)
+
+            #if the member died
+            if player.health <= 0:
+                player.health = player.max_health
+                log_event(eventlog.DEATH, player, monster.level, damage)
+                if user is self.view.owner:
+                    self.view.button_manager.button_disabled(False,"work","cancel","hunt")
+                    self.view.my_hunting_button.label = "Start Hunting"
+                    self.update_monster_info("")
+                    monster.health = monster.max_health
+                    self.state.party_damage.clear()
+                    self.state.monster_found = None
+                    hunting = False
+                else:
+                    self.leave_party(user.id)
+                await self.state.renderer.flush()
+                await interaction.message.reply(f"{user.mention} has died!")
+            if hunting:
+                self.update_monster_info()
+
+        for user, player in members:
+            player_store.mark_dirty(player)
+            if leaderboard != None:
+                leaderboard.update(player, player.guild_id)
+
+        #members who reached the last level leave the party, the owner's game ends
+        for user in winners:
+            if user is not self.view.owner:
+                self.leave_party(user.id)
+        self.update_player_info()
+        self.update_party_info()
+        if self.view.owner in winners:
+            self.view.button_manager.button_disabled(True,"work","cancel","hunt","party")
+            self.view.my_hunting_button.label = "Start Hunting"
+            hunting = False
+        self.state.renderer.edit(interaction, embed = self.state.embed_hunt, view = self.view)
+        if winners:
+            await self.state.renderer.flush()
+            await interaction.message.reply(" ".join(user.mention for user in winners) + " won!")
+        if self.view.owner in winners:
+            self.view.finish()
+        return hunting
+
+    async def toggle_member(self,user,interaction):
+        """Add the player to this game's party, or take them out when they are already in it
+        """
+        if user.id in self.state.party:
+            self.leave_party(user.id)
+        else:
+            guild_id = self.view.msg.guild.id if self.view.msg.guild != None else None
+            if not session_registry.admit(user.id, guild_id):
+                return
+            player = player_store.load(user.id, display_name(user))
+            if guild_id != None and player.guild_id != guild_id:
+                player.guild_id = guild_id
+                player_store.mark_dirty(player)
+            #joining closes the player's own game (one game per player)
+            member = PartyMember(self.view, user.id)
+            session_registry.open(user.id, guild_id, member)
+            self.state.party[user.id] = (user, player, member)
+        self.update_party_info()
+        self.state.renderer.edit(interaction, embed = self.state.embed_hunt, view = self.view)
+
+    def leave_party(self,user_id):
+        """Take a player out of the party (their damage on the current monster is lost)
+        """
+        entry = self.state.party.pop(user_id, None)
+        self.state.party_damage.pop(user_id, None)
+        if entry != None:
+            session_registry.close(user_id, entry[2])
+            self.update_party_info()
+
+    def disband_party(self):
+        for user_id in list(self.state.party):
+            self.leave_party(user_id)
+
+    def update_party_info(self):
+        """ Update the "Hunt Embed" with the party members
+        """
+        self.state.embed_hunt.set_field(2, tuple((player.name, player.level, player.health, player.max_health) for _, player, _ in self.state.party.values()))
+
+# Start a game when "!bot" is sent in one of the game channels
+async def start_game(msg):
+    guild_id = msg.guild.id if msg.guild != None else None
+    #"!bot" is routed to the game channels of every guild, each guild only plays in its own
+    channel_ids = game_config.for_guild(guild_id).channel_ids
+    if channel_ids and msg.channel.id not in channel_ids:
+        return
+    if not session_registry.admit(msg.author.id, guild_id):
+        await msg.reply("Too many games are running, try again later.")
+        return
+    if recorder != None:
+        recorder.record(msg.author.id, guild_id, "bot")
+    #persistent games get a session id carried by the buttons' custom_id
+    session_id = session_store.create(msg.author.id, guild_id) if session_store != None else None
+    view = MyView(msg, session_id=session_id)
+    session_registry.open(msg.author.id, guild_id, view)
+    # Reply to the message with a mention to the author and a custom view
+    await msg.reply(msg.author.mention, view=view, embed = view.state.embed_hunt.embed)
+    await view.delete_responded_message()
+
+def restore_game(interaction, session_id):
+    """Rebuild the game of a persistent message (after an idle eviction or a restart),
+    the caller checks session_registry.admit() first
+
+    Returns:
+
+    MyView of the game, registered in the session registry
+    """
+    view = MyView(interaction.message, owner=interaction.user, session_id=session_id)
+
+    #the labels on the message tell whether the game was working or hunting
+    for row in interaction.message.components:
+        for component in getattr(row, 'children', ()):
+            decoded = decode_custom_id(getattr(component, 'custom_id', None))
+            if decoded != None and decoded[0] in BUTTON_ACTIONS:
+                button = view.children[BUTTON_ACTIONS[decoded[0]]]
+                button.label = component.label
+                button.disabled = component.disabled
+
+    guild_id = interaction.guild.id if interaction.guild != None else None
+    session_registry.open(interaction.user.id, guild_id, view)
+    return view
+
+# Single handler of every persistent game button
+async def handle_component(interaction):
+    decoded = decode_custom_id(getattr(interaction, 'custom_id', None))
+    if decoded == None or session_store == None:
+        return
+    action, owner_id, session_id = decoded
+
+    #only the player who started the game can use its buttons (the others can only join its party)
+    if action not in BUTTON_ACTIONS or (interaction.user.id == owner_id) == (action == "party"):
+        return
+
+    view = session_registry.get(owner_id)
+    if view == None or view.session_id != session_id:
+        #a game is only rebuilt for its owner
+        if action == "party" or not session_store.is_open(session_id, owner_id):
+            await interaction.response.send_message("This game is over.", ephemeral = True)
+            return
+        guild_id = interaction.guild.id if interaction.guild != None else None
+        if not session_registry.admit(owner_id, guild_id):
+            await interaction.response.send_message("Too many games are running, try again later.", ephemeral = True)
+            return
+        view = restore_game(interaction, session_id)
+    await view.handle(action, interaction)